@@ -28,6 +28,7 @@ def build_executable():
         "--hidden-import=pandas",
         "--hidden-import=requests",
         "--hidden-import=bs4",
+        "--hidden-import=lxml",
         "--hidden-import=tkinter",
         "--hidden-import=openpyxl.styles",
         "--clean",             # Clean build
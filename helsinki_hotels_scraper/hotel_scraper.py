@@ -4,13 +4,17 @@ Fetches hotel data from TripAdvisor and exports to Excel
 """
 
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime
 import os
 import sys
 import time
 import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from http_archive import REPLAY, ArchivingSession
+from page_parsing import listing_summary
 
 # Constants
 TRIPADVISOR_URL = "https://www.tripadvisor.com/Hotels-g189934-zfc5-Helsinki_Uusimaa-Hotels.html"
@@ -52,6 +56,7 @@ def fetch_hotels_from_tripadvisor():
     """
     Fetch 5-star hotel data from TripAdvisor
     Returns a list of dictionaries with hotel information
+    Each page is parsed in a separate process during the delay before the next request.
     """
     hotels = []
     page_num = 0
@@ -61,91 +66,83 @@ def fetch_hotels_from_tripadvisor():
     print("Searching for 5-star hotels in Helsinki...")
     print()
 
-    while page_num < max_pages:
-        try:
-            # TripAdvisor pagination: oa0, oa30, oa60, etc.
-            if page_num == 0:
-                url = TRIPADVISOR_URL
-            else:
-                offset = page_num * 30
-                url = f"https://www.tripadvisor.com/Hotels-g189934-oa{offset}-zfc5-Helsinki_Uusimaa-Hotels.html"
-
-            print(f"Fetching page {page_num + 1}...")
-
-            # Add delay to be respectful to the server
-            if page_num > 0:
-                time.sleep(random.uniform(2, 4))
-
-            response = requests.get(url, headers=HEADERS, timeout=30)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Find hotel cards - TripAdvisor uses various class names
-            hotel_cards = soup.find_all('div', {'data-automation': 'hotel-card-title'})
-
-            if not hotel_cards:
-                # Try alternative selectors
-                hotel_cards = soup.find_all('div', class_=lambda x: x and 'listing_title' in x.lower() if x else False)
-
-            if not hotel_cards:
-                # Another approach - find by link patterns
-                hotel_links = soup.find_all('a', href=lambda x: x and '/Hotel_Review-' in x if x else False)
-
-                for link in hotel_links:
-                    name = link.get_text(strip=True)
-                    if name and len(name) > 2 and not any(skip in name.lower() for skip in ['review', 'photo', 'see all']):
-                        # Check if we already have this hotel
-                        if not any(h['Name'] == name for h in hotels):
-                            hotels.append({
-                                'Name': name,
-                                'Address': 'Helsinki, Finland',
-                                'Stars': '5-Star'
-                            })
-
-            # Try to find more detailed information
-            property_cards = soup.find_all('div', {'data-automation': True})
-
-            for card in property_cards:
-                try:
-                    # Find hotel name
-                    name_elem = card.find(['a', 'span', 'div'], class_=lambda x: x and any(
-                        term in str(x).lower() for term in ['title', 'name', 'header']
-                    ) if x else False)
-
-                    if name_elem:
-                        name = name_elem.get_text(strip=True)
-                        if name and len(name) > 3:
-                            # Try to find address
-                            address_elem = card.find(['span', 'div'], class_=lambda x: x and 'address' in str(x).lower() if x else False)
-                            address = address_elem.get_text(strip=True) if address_elem else 'Helsinki, Finland'
-
-                            if not any(h['Name'] == name for h in hotels):
-                                hotels.append({
-                                    'Name': name,
-                                    'Address': address,
-                                    'Stars': '5-Star'
-                                })
-                except Exception:
-                    continue
-
-            # Check if there's a next page
-            next_button = soup.find('a', {'aria-label': 'Next page'})
-            if not next_button and page_num > 0:
+    session = ArchivingSession()  # Records every page; HTTP_ARCHIVE=replay reads them back offline
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    parsing = None  # The previous page's parse, still running
+    try:
+        while page_num < max_pages:
+            try:
+                # TripAdvisor pagination: oa0, oa30, oa60, etc.
+                if page_num == 0:
+                    url = TRIPADVISOR_URL
+                else:
+                    offset = page_num * 30
+                    url = f"https://www.tripadvisor.com/Hotels-g189934-oa{offset}-zfc5-Helsinki_Uusimaa-Hotels.html"
+
+                if parsing:
+                    # Add delay to be respectful to the server - the previous page is parsed meanwhile
+                    delay_until = time.monotonic() + (0 if REPLAY else random.uniform(2, 4))
+                    listing = parsing.result()
+                    parsing = None
+                    add_listing_hotels(hotels, listing)
+
+                    # Check if there's a next page
+                    if not listing['has_next_page'] and page_num > 1:
+                        break
+                    time.sleep(max(0.0, delay_until - time.monotonic()))
+
+                print(f"Fetching page {page_num + 1}...")
+
+                response = session.get(url, headers=HEADERS, timeout=30)
+                response.raise_for_status()
+
+                parsing = pool.submit(listing_summary, response.content)
+                page_num += 1
+
+            except requests.exceptions.RequestException as e:
+                print(f"Network error: {e}")
+                break
+            except Exception as e:
+                print(f"Error parsing page: {e}")
+                parsing = None
                 break
 
-            page_num += 1
-
-        except requests.exceptions.RequestException as e:
-            print(f"Network error: {e}")
-            break
-        except Exception as e:
-            print(f"Error parsing page: {e}")
-            break
+        if parsing:
+            try:
+                add_listing_hotels(hotels, parsing.result())
+            except Exception as e:
+                print(f"Error parsing page: {e}")
+    finally:
+        pool.shutdown()
 
     return hotels
 
 
+def add_listing_hotels(hotels, listing):
+    """Add the hotels of one parsed listing page (see listing_summary) that aren't in hotels yet"""
+    # Find hotel cards - TripAdvisor uses various class names
+    if not listing['has_hotel_cards']:
+        # Another approach - find by link patterns
+        for name in listing['link_names']:
+            if name and len(name) > 2 and not any(skip in name.lower() for skip in ['review', 'photo', 'see all']):
+                # Check if we already have this hotel
+                if not any(h['Name'] == name for h in hotels):
+                    hotels.append({
+                        'Name': name,
+                        'Address': 'Helsinki, Finland',
+                        'Stars': '5-Star'
+                    })
+
+    # Try to find more detailed information
+    for name, address in listing['property_cards']:
+        if name and len(name) > 3 and not any(h['Name'] == name for h in hotels):
+            hotels.append({
+                'Name': name,
+                'Address': address or 'Helsinki, Finland',
+                'Stars': '5-Star'
+            })
+
+
 def fetch_hotels_alternative():
     """
     Alternative method using TripAdvisor's search approach
@@ -306,4 +303,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # The parse process starts the EXE again
     main()
@@ -6,8 +6,6 @@ User-friendly application to fetch hotel data and export to Excel
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime
 import os
@@ -15,6 +13,9 @@ import sys
 import time
 import random
 
+from http_archive import REPLAY, ArchivingSession
+from page_parsing import hotel_link_names, parse_listing
+
 # Constants
 TRIPADVISOR_URL = "https://www.tripadvisor.com/Hotels-g190479-zfc5-Oslo_Eastern_Norway-Hotels.html"
 HEADERS = {
@@ -28,7 +29,7 @@ HEADERS = {
 class HotelScraperApp:
     def __init__(self, root):
         self.root = root
-        self.root.title("Oslo 5-Star Hotels Scraper")
+        self.root.title("Oslo 5-Star Hotels Scraper" + (" (replay from archive)" if REPLAY else ""))
         self.root.geometry("700x550")
         self.root.resizable(True, True)
 
@@ -40,6 +41,7 @@ class HotelScraperApp:
 
         self.hotels = []
         self.is_running = False
+        self.session = ArchivingSession()  # Records every page; HTTP_ARCHIVE=replay reads them back offline
 
         self.setup_ui()
 
@@ -171,17 +173,12 @@ class HotelScraperApp:
             # Try scraping TripAdvisor
             self.update_status("Searching for 5-star hotels in Oslo...")
 
-            response = requests.get(TRIPADVISOR_URL, headers=HEADERS, timeout=30)
+            response = self.session.get(TRIPADVISOR_URL, headers=HEADERS, timeout=30)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.content, 'html.parser')
-
             # Find hotel links
-            hotel_links = soup.find_all('a', href=lambda x: x and '/Hotel_Review-' in x if x else False)
-
             seen_names = set()
-            for link in hotel_links:
-                name = link.get_text(strip=True)
+            for name in hotel_link_names(parse_listing(response.content)):
                 if name and len(name) > 3 and name.lower() not in seen_names:
                     if not any(skip in name.lower() for skip in ['review', 'photo', 'see all', 'more']):
                         hotels.append({
@@ -0,0 +1,112 @@
+"""
+Response archive for the Helsinki/Oslo scrapers
+Every page fetched is recorded (status, headers, compressed body) to
+hotel_data/response_archive.db next to the script or EXE, so a fixed parser can be
+re-run on it without scraping again. HTTP_ARCHIVE=replay answers from the archive
+with no network and no delays; HTTP_ARCHIVE=off neither records nor replays.
+Same table layout as the Norway apps' archive.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+ARCHIVE_MODE = os.environ.get("HTTP_ARCHIVE", "record").strip().lower()  # record | replay | off
+REPLAY = ARCHIVE_MODE == 'replay'
+ARCHIVE_DB = "response_archive.db"
+UNARCHIVED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie'}
+
+
+class NotArchived(requests.RequestException):
+    """Replay asked for a page that was never recorded"""
+
+
+def get_archive_path():
+    if getattr(sys, 'frozen', False):
+        # Running as compiled executable
+        base_path = os.path.dirname(sys.executable)
+    else:
+        # Running as script
+        base_path = os.path.dirname(os.path.abspath(__file__))
+
+    path = os.path.join(base_path, 'hotel_data')
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, ARCHIVE_DB)
+
+
+class ResponseArchive:
+    """URL -> latest response; an error never replaces a good response"""
+
+    def __init__(self, path=None):
+        self.conn = sqlite3.connect(path or get_archive_path(), check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    reason TEXT NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def record(self, key, response):
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in UNARCHIVED_HEADERS}
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO responses (key, status, reason, headers, body, fetched_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    status = excluded.status, reason = excluded.reason, headers = excluded.headers,
+                    body = excluded.body, fetched_at = excluded.fetched_at
+                WHERE excluded.status < 400 OR responses.status >= 400
+            """, (key, response.status_code, response.reason or '', json.dumps(headers),
+                  zlib.compress(response.content), time.time()))
+
+    def replay(self, key, method, url):
+        """The archived response for key as a requests.Response; raises NotArchived"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, reason, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            raise NotArchived(f"not in the response archive: {key}")
+        status, reason, headers, body = row
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response._content = zlib.decompress(body)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+
+class ArchivingSession(requests.Session):
+    """requests.Session that records every response, or answers from the archive when replaying"""
+
+    def __init__(self, archive=None):
+        super().__init__()
+        self.archive = archive if archive is not None or ARCHIVE_MODE == 'off' else ResponseArchive()
+
+    def request(self, method, url, *args, **kwargs):
+        key = f"{method.upper()} {requests.Request(method, url, params=kwargs.get('params')).prepare().url}"
+        if REPLAY:
+            if self.archive is None:
+                raise NotArchived(f"not in the response archive: {key}")
+            return self.archive.replay(key, method, url)
+
+        response = super().request(method, url, *args, **kwargs)
+        if self.archive is not None and not kwargs.get('stream'):
+            self.archive.record(key, response)
+        return response
@@ -0,0 +1,77 @@
+"""
+Fast parsing of TripAdvisor hotel listing pages
+Shared by the console (Helsinki) and GUI (Oslo) scrapers. Uses lxml's C parser when
+it is installed (html.parser otherwise), cuts scripts/styles out before parsing,
+parses the page once into a tree of only the element types the scrapers look at
+(SoupStrainer), and matches classes and links with precompiled patterns instead of
+per-element lambdas. listing_summary() returns plain data, so a page can be parsed in
+another process and only the extracted values come back.
+"""
+
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401 - only needed as BeautifulSoup's parser
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+NOISE_RE = re.compile(r'<(script|style|noscript|svg|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->', re.S | re.I)
+HOTEL_REVIEW_RE = re.compile(r'/Hotel_Review-')
+LISTING_TITLE_RE = re.compile(r'listing_title', re.I)
+TITLE_CLASS_RE = re.compile(r'title|name|header', re.I)
+ADDRESS_CLASS_RE = re.compile(r'address', re.I)
+
+# Everything the listing parser looks at is an <a> or a <div> (and what's inside them)
+LISTING_ELEMENTS = SoupStrainer(['a', 'div'])
+
+
+def strip_noise(content):
+    """Page markup as str, without script/style/svg/template blocks and comments"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    return NOISE_RE.sub(' ', content)
+
+
+def parse_listing(content):
+    """One parse of a listing page: the <a>/<div> elements, without scripts and styles"""
+    return BeautifulSoup(strip_noise(content), PARSER, parse_only=LISTING_ELEMENTS)
+
+
+def has_hotel_cards(soup):
+    return bool(soup.find('div', attrs={'data-automation': 'hotel-card-title'})
+                or soup.find('div', class_=LISTING_TITLE_RE))
+
+
+def hotel_link_names(soup):
+    """Text of every /Hotel_Review- link"""
+    return [link.get_text(strip=True) for link in soup.find_all('a', href=HOTEL_REVIEW_RE)]
+
+
+def property_cards(soup):
+    """(name, address or None) for each data-automation card with a title-like element"""
+    cards = []
+    for card in soup.find_all('div', attrs={'data-automation': True}):
+        name_elem = card.find(['a', 'span', 'div'], class_=TITLE_CLASS_RE)
+        if not name_elem:
+            continue
+        address_elem = card.find(['span', 'div'], class_=ADDRESS_CLASS_RE)
+        cards.append((name_elem.get_text(strip=True), address_elem.get_text(strip=True) if address_elem else None))
+    return cards
+
+
+def has_next_page(soup):
+    return soup.find('a', attrs={'aria-label': 'Next page'}) is not None
+
+
+def listing_summary(content):
+    """Everything the scrapers read from a listing page, as small picklable data"""
+    soup = parse_listing(content)
+    return {
+        'has_hotel_cards': has_hotel_cards(soup),
+        'link_names': hotel_link_names(soup),
+        'property_cards': property_cards(soup),
+        'has_next_page': has_next_page(soup),
+    }
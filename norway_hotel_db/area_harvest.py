@@ -0,0 +1,163 @@
+"""
+Area harvest: one Google Text Search per municipality instead of one call per hotel
+A "hotel in <municipality>" search returns up to 20 lodging places per page; the
+places are matched locally against the Brreg records (name + address), and only
+the hotels left unmatched need their own Find Place call.
+"""
+
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from http_client import REPLAY
+
+GOOGLE_TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+
+HARVEST_MAX_PAGES = 3  # Text Search stops after 60 results (3 pages of 20)
+HARVEST_MIN_HOTELS = 3  # Below this many pending hotels, per-hotel lookups cost the same
+NEXT_PAGE_DELAY = 2  # A next_page_token only becomes valid after a short delay
+MATCH_THRESHOLD = 0.75  # Name similarity a place needs on its own
+SAME_STREET_THRESHOLD = 0.6  # ... or at the hotel's own street address
+AMBIGUITY_MARGIN = 0.1  # A second place this close to the best: leave the hotel to its own lookup
+
+LEGAL_WORDS = re.compile(r'\b(as|asa|ans|da|enk|sa|drift|driftsselskap|avd|avdeling|eiendom|holding)\b')
+GENERIC_WORDS = {'hotel', 'hotell', 'hotels', 'the', 'og', 'and', 'norway', 'norge'}
+
+
+class PartialHarvest(Exception):
+    """A harvest cut short by a stop or a failed later page; places holds what it got (use it, don't cache it)"""
+
+    def __init__(self, places, reason):
+        super().__init__(f"stopped after {len(places)} places ({reason})")
+        self.places = places
+
+
+def name_tokens(name, ignore=()):
+    """Distinctive words of a hotel or company name"""
+    name = LEGAL_WORDS.sub(' ', unicodedata.normalize('NFKC', str(name)).casefold())
+    tokens = [t for t in re.findall(r'\w+', name) if t not in GENERIC_WORDS]
+    distinctive = [t for t in tokens if t not in ignore]
+    return distinctive or tokens  # "Tromsø Hotell" is still called Tromsø
+
+
+def token_similarity(tokens_a, tokens_b):
+    """0..1: the better of word overlap (Dice) and spelling similarity"""
+    if not tokens_a or not tokens_b:
+        return 0.0
+    overlap = len(set(tokens_a) & set(tokens_b))
+    dice = 2 * overlap / (len(set(tokens_a)) + len(set(tokens_b)))
+    spelling = SequenceMatcher(None, ''.join(sorted(tokens_a)), ''.join(sorted(tokens_b))).ratio()
+    return max(dice, spelling)
+
+
+def postcode(address):
+    match = re.search(r'\b(\d{4})\b', str(address))
+    return match.group(1) if match else ''
+
+
+def street(address):
+    first = str(address).split(',')[0]
+    return ' '.join(re.findall(r'\w+', first.casefold())) if re.search(r'\d', first) else ''
+
+
+def match_score(hotel, place, municipality=''):
+    """
+    How likely a Google place is this Brreg record; 0 if it can't be. The names must share
+    a distinctive word and be similar on their own - the address only ranks the places
+    that pass (a different postcode rules a place out, the same street lowers the bar).
+    """
+    ignore = set(name_tokens(municipality))
+    hotel_tokens = name_tokens(hotel.get('legal_name', ''), ignore)
+    place_tokens = name_tokens(place.get('name', ''), ignore)
+    if not set(hotel_tokens) & set(place_tokens):
+        return 0.0  # Spelling alone matches Nord Hotell to Nordic Hotel
+    score = token_similarity(hotel_tokens, place_tokens)
+
+    hotel_address, place_address = hotel.get('address', ''), place.get('formatted_address', '')
+    hotel_street = street(hotel_address)
+    same_street = bool(hotel_street) and hotel_street == street(place_address)
+    if score < (SAME_STREET_THRESHOLD if same_street else MATCH_THRESHOLD):
+        return 0.0
+
+    hotel_postcode, place_postcode = postcode(hotel_address), postcode(place_address)
+    if hotel_postcode and place_postcode and not same_street:
+        if hotel_postcode != place_postcode:
+            return 0.0
+        score += 0.15
+    if same_street:
+        score += 0.25
+    return score
+
+
+def match_places(hotels, places, municipality=''):
+    """
+    {index: place} for the (index, hotel) pairs with one clearly best matching place.
+    Hotels with no match, or two places within AMBIGUITY_MARGIN, are left for a per-hotel lookup.
+    Several Brreg entities may match one place (property and operating company of one hotel).
+    """
+    matches = {}
+    for idx, hotel in hotels:
+        scored = sorted(((match_score(hotel, place, municipality), place) for place in places),
+                        key=lambda pair: pair[0], reverse=True)
+        scored = [(score, place) for score, place in scored if score > 0]
+        if not scored:
+            continue
+        best_score, best = scored[0]
+        if any(score >= best_score - AMBIGUITY_MARGIN and place.get('place_id') != best.get('place_id')
+               for score, place in scored[1:]):
+            continue
+        matches[idx] = best
+    return matches
+
+
+def group_by_municipality(hotels, min_hotels=HARVEST_MIN_HOTELS):
+    """{municipality: [(index, hotel)]}, only municipalities worth a harvest"""
+    groups = defaultdict(list)
+    for idx, hotel in hotels:
+        if hotel.get('municipality'):
+            groups[hotel['municipality']].append((idx, hotel))
+    return {m: group for m, group in groups.items() if len(group) >= min_hotels}
+
+
+def harvest_query(municipality):
+    return f"hotel in {municipality.title()}, Norway"
+
+
+def harvest_area(request, municipality, should_continue=lambda: True):
+    """
+    All lodging places Text Search returns for the municipality.
+    request(url, params) makes one quota-counted call and returns the JSON.
+    The first page raises on errors; a stop or a failing later page raises PartialHarvest,
+    so a cut-short list is never cached as the municipality's result.
+    """
+    places = []
+    params = {'query': harvest_query(municipality), 'type': 'lodging', 'region': 'no'}
+
+    for page in range(HARVEST_MAX_PAGES):
+        if page and not REPLAY:
+            time.sleep(NEXT_PAGE_DELAY)
+        try:
+            data = request(GOOGLE_TEXT_SEARCH_URL, params)
+        except Exception as e:
+            if not page:
+                raise
+            raise PartialHarvest(places, e) from e
+
+        for place in data.get('results', []):
+            places.append({
+                'name': place.get('name', ''),
+                'formatted_address': place.get('formatted_address', ''),
+                'rating': place.get('rating', ''),
+                'place_id': place.get('place_id', ''),
+            })
+
+        token = data.get('next_page_token')
+        if not token:
+            break
+        if not should_continue():
+            raise PartialHarvest(places, "stopped")
+        params = {'pagetoken': token}
+
+    return places
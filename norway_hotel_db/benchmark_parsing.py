@@ -0,0 +1,149 @@
+"""
+Benchmark page parsing: the old full-tree BeautifulSoup parsing vs the fast parsing layer
+(html_parsing.py here, page_parsing.py in helsinki_hotels_scraper).
+
+Usage:
+    python benchmark_parsing.py [folder with saved pages] [repeats]
+
+Saved pages are picked by file name: proff*.html (Proff.no company pages),
+tripadvisor*.html (TripAdvisor search results) and listing*.html (TripAdvisor hotel
+listings, as scraped for Helsinki/Oslo). Without a folder, synthetic pages are used.
+"""
+
+import glob
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from enrichment import parse_proff_page, parse_tripadvisor_search
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'helsinki_hotels_scraper'))
+try:
+    import page_parsing
+except ImportError:
+    page_parsing = None
+
+
+# ---- Before: the parsing code the scrapers used until now ----
+
+def old_proff(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    result = {}
+    role_elements = soup.find_all(['div', 'span', 'td'], string=re.compile(r'Daglig leder|Styreleder|CEO', re.I))
+    for elem in role_elements:
+        parent = elem.find_parent(['div', 'tr', 'li', 'table'])
+        if parent:
+            match = re.search(r'(?:Daglig leder|Styreleder)[:\s]+([A-ZÆØÅ][a-zæøå]+ [A-ZÆØÅ][a-zæøå]+)', parent.get_text())
+            if match:
+                result['owner'] = match.group(1)
+                break
+    revenue_elem = soup.find(string=re.compile(r'Driftsinntekter|Omsetning|Salgsinntekt', re.I))
+    if revenue_elem:
+        parent = revenue_elem.find_parent(['div', 'tr', 'table'])
+        if parent:
+            numbers = re.findall(r'([\d\s,\.]+)\s*(?:MNOK|TNOK|NOK|mill|tusen)?', parent.get_text())
+            if numbers:
+                result['revenue'] = numbers[0].strip()
+    return result or None
+
+
+def old_tripadvisor(content):
+    text = BeautifulSoup(content, 'html.parser').get_text()
+    room_match = re.search(r'(\d+)\s*(?:rooms?|rom|værelser?)', text, re.IGNORECASE)
+    star_match = re.search(r'(\d(?:\.\d)?)\s*(?:star|stjerne)', text, re.IGNORECASE)
+    return room_match.group(1) if room_match else '', star_match.group(1) if star_match else ''
+
+
+def old_listing(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    names = []
+    hotel_cards = soup.find_all('div', {'data-automation': 'hotel-card-title'})
+    if not hotel_cards:
+        hotel_cards = soup.find_all('div', class_=lambda x: x and 'listing_title' in x.lower() if x else False)
+    if not hotel_cards:
+        for link in soup.find_all('a', href=lambda x: x and '/Hotel_Review-' in x if x else False):
+            names.append(link.get_text(strip=True))
+    for card in soup.find_all('div', {'data-automation': True}):
+        name_elem = card.find(['a', 'span', 'div'], class_=lambda x: x and any(
+            term in str(x).lower() for term in ['title', 'name', 'header']
+        ) if x else False)
+        if name_elem:
+            card.find(['span', 'div'], class_=lambda x: x and 'address' in str(x).lower() if x else False)
+            names.append(name_elem.get_text(strip=True))
+    soup.find('a', {'aria-label': 'Next page'})
+    return names
+
+
+# ---- After ----
+
+def new_listing(content):
+    soup = page_parsing.parse_listing(content)
+    names = []
+    if not page_parsing.has_hotel_cards(soup):
+        names.extend(page_parsing.hotel_link_names(soup))
+    names.extend(name for name, _ in page_parsing.property_cards(soup))
+    page_parsing.has_next_page(soup)
+    return names
+
+
+def synthetic_pages():
+    """Pages shaped like the real ones: mostly script/JSON, a little markup"""
+    scripts = ''.join(f'<script>window.__DATA_{i}__ = {{"items": [{", ".join(str(n) for n in range(400))}]}};</script>'
+                      for i in range(60))
+    nav = ''.join(f'<li><a href="/link{i}">Menu item {i}</a></li>' for i in range(300))
+    proff = (f'<html><head>{scripts}<style>.x{{color:red}}</style></head><body><ul>{nav}</ul>'
+             '<div class="roles"><table><tr><td>Daglig leder</td><td>Olav Thon</td></tr></table></div>'
+             '<div><table><tr><td>Driftsinntekter</td><td>45 000 000</td></tr></table></div></body></html>')
+    results = ''.join(f'<div class="result"><a href="/Hotel_Review-g1-d{i}">Hotel {i}</a><span>{i % 5} star</span></div>'
+                      for i in range(30))
+    tripadvisor = f'<html><head>{scripts}</head><body><ul>{nav}</ul>{results}<p>125 rooms</p></body></html>'
+    cards = ''.join(f'<div data-automation="card"><div class="listing_header"><a>Hotel {i}</a></div>'
+                    f'<span class="address">Street {i}, Helsinki</span></div>' for i in range(30))
+    listing = f'<html><head>{scripts}</head><body><ul>{nav}</ul>{results}{cards}<a aria-label="Next page">Next</a></body></html>'
+    return {'proff': [('synthetic', proff.encode())],
+            'tripadvisor': [('synthetic', tripadvisor.encode())],
+            'listing': [('synthetic', listing.encode())]}
+
+
+def saved_pages(folder):
+    pages = {}
+    for kind in ('proff', 'tripadvisor', 'listing'):
+        for path in sorted(glob.glob(os.path.join(folder, f'{kind}*.htm*'))):
+            with open(path, 'rb') as f:
+                pages.setdefault(kind, []).append((os.path.basename(path), f.read()))
+    return pages
+
+
+def per_page_ms(fn, content, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(content)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else None
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    pages = saved_pages(folder) if folder else synthetic_pages()
+
+    parsers = {
+        'proff': (old_proff, parse_proff_page),
+        'tripadvisor': (old_tripadvisor, lambda content: parse_tripadvisor_search(content, '')),
+        'listing': (old_listing, new_listing if page_parsing else None),
+    }
+
+    print(f"{'page':40} {'size':>9} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for kind, (old, new) in parsers.items():
+        if new is None:
+            continue
+        for name, content in pages.get(kind, []):
+            before = per_page_ms(old, content, repeats)
+            after = per_page_ms(new, content, repeats)
+            print(f"{kind + ': ' + name:40} {len(content) // 1024:>7}KB {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
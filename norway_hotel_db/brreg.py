@@ -0,0 +1,545 @@
+"""
+Brreg (Enhetsregisteret) helpers for the Norway Hotel Database
+Turns registry entities into hotel records and streams the bulk enheter dump.
+"""
+
+import gzip
+import io
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from http_client import REPLAY, NotArchived, create_session
+from resilience import is_transient, retry_call
+
+BRREG_ENHETER_URL = "https://data.brreg.no/enhetsregisteret/api/enheter"
+BRREG_BULK_URL = "https://data.brreg.no/enhetsregisteret/api/enheter/lastned"
+BRREG_KOMMUNER_URL = "https://data.brreg.no/enhetsregisteret/api/kommuner"
+BRREG_UPDATES_URL = "https://data.brreg.no/enhetsregisteret/api/oppdateringer/enheter"
+
+# Fylker after the 2024 county reform (fylkesnummer = first 2 digits of kommunenummer)
+FYLKER = {
+    "03": "Oslo",
+    "11": "Rogaland",
+    "15": "Møre og Romsdal",
+    "18": "Nordland",
+    "21": "Svalbard",  # Not a fylke, but kommune 2111 has its own prefix
+    "31": "Østfold",
+    "32": "Akershus",
+    "33": "Buskerud",
+    "34": "Innlandet",
+    "39": "Vestfold",
+    "40": "Telemark",
+    "42": "Agder",
+    "46": "Vestland",
+    "50": "Trøndelag",
+    "55": "Troms",
+    "56": "Finnmark",
+}
+
+# Regions offered in the GUI -> fylkesnummer
+REGIONS = {
+    "Nord-Norge": ["18", "55", "56"],  # Nordland, Troms, Finnmark
+    "Trøndelag": ["50"],
+    "Vestlandet": ["11", "46", "15"],  # Rogaland, Vestland, Møre og Romsdal
+    "Østlandet": ["03", "31", "32", "33", "34", "39", "40"],  # Oslo, Østfold, Akershus, Buskerud, Innlandet, Vestfold, Telemark
+    "Sørlandet": ["42"],  # Agder
+    "Hele Norge": []  # All - no filter
+}
+
+# NACE codes for accommodation (use short codes - API returns 55.100, 55.200, etc)
+NACE_CODES = {
+    "hotels": ["55.100"],  # Hotels
+    "bb": ["55.200", "55.900"],  # B&B, hostels, other accommodation
+    "camping": ["55.300"]  # Camping
+}
+
+# Discovery sources
+SOURCE_API = "Brreg API"
+SOURCE_BULK = "Brreg bulk dump"
+SOURCE_DELTA = "Brreg changes since last run"
+
+PAGE_SIZE = 100
+MAX_PAGES = 10000 // PAGE_SIZE  # Brreg refuses page * size beyond 10,000
+DISCOVERY_WORKERS = 4  # Default cap on parallel Brreg requests
+PAGE_RETRY_ATTEMPTS = 5  # Tries per result page before it is left for the next resume
+UPDATES_PAGE_SIZE = 10000  # Largest page the update feed serves
+
+# Fields that come from Brreg; everything else on a hotel record is enrichment
+BRREG_FIELDS = ('org_number', 'legal_name', 'address', 'municipality', 'property_type')
+
+
+def fylke_names(codes):
+    """'Nordland, Finnmark' for ['18', '56']; codes FYLKER doesn't know are shown as they are"""
+    return ', '.join(FYLKER.get(code, code) for code in codes)
+
+
+def classify_type(name, nace):
+    """Guess property type from company name and NACE code"""
+    name_lower = name.lower()
+    if 'camping' in name_lower or nace == '55.300':
+        return 'Camping'
+    elif any(x in name_lower for x in ['pensjonat', 'gjestehus', 'b&b']):
+        return 'B&B'
+    elif 'vandrerhjem' in name_lower or 'hostel' in name_lower:
+        return 'Hostel'
+    elif 'resort' in name_lower:
+        return 'Resort'
+    elif 'lodge' in name_lower:
+        return 'Lodge'
+    return 'Hotel'
+
+
+def company_address(company):
+    """Business address, falling back to postal address"""
+    return company.get('forretningsadresse', {}) or company.get('postadresse', {}) or {}
+
+
+def in_region(company, fylke_prefixes, exclude_prefixes=()):
+    """
+    True if the company's kommunenummer starts with one of the fylke prefixes (any, if
+    there are none) and with none of exclude_prefixes
+    """
+    kommune_nr = company_address(company).get('kommunenummer', '')
+    if not kommune_nr:
+        return True  # Keep entities without kommunenummer, as the API crawl does
+    if any(kommune_nr.startswith(prefix) for prefix in exclude_prefixes):
+        return False
+    return not fylke_prefixes or any(kommune_nr.startswith(prefix) for prefix in fylke_prefixes)
+
+
+def company_to_hotel(company, nace):
+    """Convert a Brreg entity to a hotel record"""
+    addr = company_address(company)
+
+    address_parts = addr.get('adresse', [])
+    address = ', '.join(address_parts) if address_parts else ''
+    postal = f"{addr.get('postnummer', '')} {addr.get('poststed', '')}".strip()
+    full_address = f"{address}, {postal}" if address else postal
+
+    return {
+        'org_number': company.get('organisasjonsnummer', ''),
+        'legal_name': company.get('navn', ''),
+        'commercial_name': '',
+        'address': full_address,
+        'municipality': addr.get('kommune', ''),
+        'property_type': classify_type(company.get('navn', ''), nace),
+        'stars': '',
+        'brand': '',
+        'phone': '',
+        'website': '',
+        'google_rating': '',
+        'duplicate_of': '',  # org_number of the entity this one shares a hotel with
+        'status': 'Discovered'
+    }
+
+
+def matching_nace(company, nace_codes):
+    """
+    Return the configured NACE code the company belongs to, or None.
+    '55.100' matches 55.101 and 55.102 like the API's naeringskode search does.
+    """
+    company_codes = [
+        (company.get(key) or {}).get('kode', '')
+        for key in ('naeringskode1', 'naeringskode2', 'naeringskode3')
+    ]
+    for nace in nace_codes:
+        prefix = nace.rstrip('0').rstrip('.')
+        if any(code == nace or code.startswith(prefix) for code in company_codes if code):
+            return nace
+    return None
+
+
+# ============================================================
+# BULK DUMP STREAMING
+# ============================================================
+
+def iter_json_array(stream, chunk_size=1 << 16):
+    """
+    Yield the items of a top-level JSON array read from a text stream,
+    decoding one item at a time so the whole array is never in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = stream.read(chunk_size)
+    pos = buf.find('[')
+    while pos < 0:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        buf += chunk
+        pos = buf.find('[')
+    pos += 1
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buf) and buf[pos] == ']':
+            return
+
+        try:
+            item, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                if buf[pos:].strip():
+                    raise
+                return
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+
+        yield item
+
+
+def open_bulk_dump(source=None):
+    """
+    Open the enheter dump as a text stream.
+    source: local path (.json or .json.gz) or URL; None downloads the current dump.
+    The download is rate-scheduled but never archived (too big), so replay needs a local file.
+    """
+    source = source or BRREG_BULK_URL
+
+    if source.startswith(('http://', 'https://')):
+        if REPLAY:
+            raise NotArchived(f"the Brreg dump is not archived - pass a local dump file to replay: {source}")
+        response = create_session(pool_size=1).get(
+            source, headers={'Accept': 'application/vnd.brreg.enhetsregisteret.enhet.v2+gzip;charset=UTF-8'},
+            stream=True, timeout=60)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=response.raw), encoding='utf-8')
+
+    if source.endswith('.gz'):
+        return gzip.open(source, 'rt', encoding='utf-8')
+    return open(source, 'r', encoding='utf-8')
+
+
+def iter_bulk_hotels(source, nace_codes, fylke_prefixes, should_continue=lambda: True):
+    """
+    Stream hotel records out of the Brreg bulk dump,
+    filtering by NACE code and kommunenummer while reading.
+    """
+    with open_bulk_dump(source) as stream:
+        for company in iter_json_array(stream):
+            if not should_continue():
+                break
+
+            nace = matching_nace(company, nace_codes)
+            if not nace or not in_region(company, fylke_prefixes):
+                continue
+
+            yield company_to_hotel(company, nace)
+
+
+# ============================================================
+# REGION-FILTERED API DISCOVERY
+# ============================================================
+
+_kommuner_cache = {}
+_kommuner_lock = threading.Lock()
+
+
+def load_kommuner():
+    """
+    Current kommunenummer -> kommune name, from Brreg's own kommune register.
+    Fetched once per process; empty dict if Brreg can't be reached.
+    """
+    with _kommuner_lock:
+        if not _kommuner_cache:
+            try:
+                response = create_session(pool_size=1).get(BRREG_KOMMUNER_URL, params={'size': 1000}, timeout=30)
+                if response.status_code == 200:
+                    for kommune in response.json().get('_embedded', {}).get('kommuner', []):
+                        _kommuner_cache[kommune.get('nummer', '')] = kommune.get('navn', '')
+            except Exception as e:
+                print(f"Brreg kommuner error: {e}")
+        return dict(_kommuner_cache)
+
+
+def kommuner_by_fylke(fylker):
+    """Group current kommunenummer by fylke, for the selected fylker only"""
+    grouped = {fylke: [] for fylke in fylker}
+    for kommune_nr in sorted(load_kommuner()):
+        fylke = kommune_nr[:2]
+        if fylke in grouped:
+            grouped[fylke].append(kommune_nr)
+    return {fylke: kommuner for fylke, kommuner in grouped.items() if kommuner}
+
+
+def is_flaky(exc):
+    """Worth another try: a transient error, or a body cut off mid-transfer"""
+    return is_transient(exc) or isinstance(exc, (requests.exceptions.ChunkedEncodingError, ValueError))
+
+
+class BrregDiscovery:
+    """
+    Brreg search with the region filter pushed into the query.
+    One query per NACE code x fylke (kommunenummer list); the first page of each
+    query reveals totalPages, and the remaining pages are fetched concurrently
+    on a keep-alive session, at most max_workers requests in flight.
+    """
+
+    def __init__(self, max_workers=DISCOVERY_WORKERS, session=None):
+        self.max_workers = max(1, int(max_workers))
+        self.session = session or create_session(pool_size=self.max_workers)
+        self.pages_fetched = 0
+        self.failed_pages = []  # (nace, fylke, page) of the last discover() that gave up
+        self.elapsed = 0.0
+
+    def pages_per_second(self):
+        return self.pages_fetched / self.elapsed if self.elapsed else 0.0
+
+    def build_queries(self, nace_codes, fylker):
+        """List of (nace, fylke, kommunenummer param) to fetch"""
+        grouped = kommuner_by_fylke(fylker) if fylker else {}
+        if fylker and not grouped:
+            print("Brreg kommuner unavailable - falling back to client-side region filter")
+
+        queries = []
+        for nace in nace_codes:
+            if grouped:
+                for fylke, kommuner in grouped.items():
+                    queries.append((nace, fylke, ','.join(kommuner)))
+            else:
+                queries.append((nace, None, None))
+        return queries
+
+    def fetch_page(self, nace, kommuner, page):
+        """Fetch one result page, retried on network errors and 5xx. Returns (companies, totalPages)"""
+        params = {
+            'naeringskode': nace,
+            'size': PAGE_SIZE,
+            'page': page
+        }
+        if kommuner:
+            params['kommunenummer'] = kommuner
+
+        def get():
+            response = self.session.get(BRREG_ENHETER_URL, params=params, timeout=30)  # Paced per host by the session
+            response.raise_for_status()
+            return response.json()
+
+        data = retry_call(get, attempts=PAGE_RETRY_ATTEMPTS, should_retry=is_flaky)
+        companies = data.get('_embedded', {}).get('enheter', [])
+        return companies, data.get('page', {}).get('totalPages', 0)
+
+    def discover(self, nace_codes, fylker, limit, on_hotel, should_continue=lambda: True, on_status=None,
+                 completed_pages=None, known_orgs=(), on_page=None, exclude_fylker=()):
+        """
+        Run all queries and call on_hotel(hotel) for every new org_number, up to limit.
+        Pages are fetched on the pool but consumed here, on the calling thread,
+        so dedup and the limit need no locking. Returns the number of hotels found.
+
+        To resume a run, pass completed_pages ({(nace, fylke): {page: total_pages}})
+        and the org numbers already found; on_page(nace, fylke, page, total_pages, hotels)
+        is called after each page so the caller can checkpoint it.
+
+        Entities in exclude_fylker are skipped (a sharded run's remainder shard crawls
+        unfiltered for what the per-fylke shards can't see).
+
+        Pages that still fail after retries are listed in self.failed_pages as
+        (nace, fylke, page); a run with failed pages is incomplete, and resuming it
+        fetches just those (a failed first page means the whole query).
+        """
+        queries = self.build_queries(nace_codes, fylker)
+        completed_pages = completed_pages or {}
+        seen_orgs = set(known_orgs)
+        pending = {}
+        self.pages_fetched = 0
+        self.failed_pages = []
+        start = time.time()
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        def submit(nace, fylke, kommuner, page):
+            future = pool.submit(self.fetch_page, nace, kommuner, page)
+            pending[future] = (nace, fylke, kommuner, page)
+
+        def submit_rest(nace, fylke, kommuner, total_pages):
+            done_pages = completed_pages.get((nace, fylke), {})
+            for next_page in range(1, min(total_pages, MAX_PAGES)):
+                if next_page not in done_pages:
+                    submit(nace, fylke, kommuner, next_page)
+
+        for nace, fylke, kommuner in queries:
+            done_pages = completed_pages.get((nace, fylke), {})
+            if 0 in done_pages:
+                submit_rest(nace, fylke, kommuner, done_pages[0])
+            else:
+                submit(nace, fylke, kommuner, 0)
+
+        try:
+            while pending and should_continue() and len(seen_orgs) < limit:
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    nace, fylke, kommuner, page = pending.pop(future)
+                    try:
+                        companies, total_pages = future.result()
+                    except Exception as e:
+                        print(f"Brreg error (NACE {nace}, fylke {fylke}, page {page}): {e}")
+                        self.failed_pages.append((nace, fylke, page))
+                        continue
+
+                    self.pages_fetched += 1
+                    if page == 0:
+                        submit_rest(nace, fylke, kommuner, total_pages)
+
+                    page_hotels = []
+                    for company in companies:
+                        if len(seen_orgs) >= limit:
+                            break
+                        org = company.get('organisasjonsnummer', '')
+                        if org in seen_orgs or not in_region(company, fylker, exclude_fylker):
+                            continue
+                        seen_orgs.add(org)
+                        hotel = company_to_hotel(company, nace)
+                        page_hotels.append(hotel)
+                        on_hotel(hotel)
+
+                    if on_page:
+                        on_page(nace, fylke, page, total_pages, page_hotels)
+
+                self.elapsed = time.time() - start
+                if done and on_status:
+                    on_status(f"Brreg: {self.pages_fetched} pages, {len(seen_orgs)} hotels "
+                              f"({self.pages_per_second():.1f} pages/s)"
+                              + (f", {len(self.failed_pages)} pages failed" if self.failed_pages else ''))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.elapsed = time.time() - start
+
+        return len(seen_orgs)
+
+
+# ============================================================
+# DELTA SYNC (UPDATE FEED)
+# ============================================================
+
+def brreg_timestamp(moment=None):
+    """Timestamp in the format the update feed expects for 'dato'"""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def sync_filter(nace_codes, fylker):
+    """What a discovery run was built for - resume and deltas only apply to the same filter"""
+    return {'nace_codes': sorted(nace_codes), 'fylker': sorted(fylker)}
+
+
+def touches_nace(update, nace_codes):
+    """True if an update's JSON-patch changes set a NACE code we're looking for"""
+    for change in update.get('endringer') or []:
+        if 'naeringskode' not in change.get('path', ''):
+            continue
+        value = change.get('value')
+        code = value.get('kode', '') if isinstance(value, dict) else str(value or '')
+        if matching_nace({'naeringskode1': {'kode': code}}, nace_codes):
+            return True
+    return False
+
+
+class BrregDeltaSync:
+    """
+    Applies Brreg's update feed (oppdateringer/enheter) to a previously discovered set.
+    Only entities we already hold, or whose changes touch a wanted NACE code,
+    are re-fetched - in batches of 100 org numbers per request.
+    """
+
+    def __init__(self, session=None):
+        self.session = session or create_session()
+        self.requests_made = 0
+
+    def fetch_updates(self, last_update_id=None, since=None, should_continue=lambda: True):
+        """All updates after last_update_id (or since a timestamp). Returns (updates, last id)"""
+        updates = []
+        params = {'size': UPDATES_PAGE_SIZE, 'includeChanges': 'true'}
+        if last_update_id is not None:
+            params['oppdateringsid'] = last_update_id + 1
+        else:
+            params['dato'] = since
+
+        while should_continue():
+            response = self.session.get(BRREG_UPDATES_URL, params=params, timeout=60)
+            self.requests_made += 1
+            response.raise_for_status()
+
+            batch = response.json().get('_embedded', {}).get('oppdateringer', [])
+            updates.extend(batch)
+            if len(batch) < UPDATES_PAGE_SIZE:
+                break
+
+            params = {'size': UPDATES_PAGE_SIZE, 'includeChanges': 'true',
+                      'oppdateringsid': batch[-1]['oppdateringsid'] + 1}
+
+        if updates:
+            last_update_id = updates[-1]['oppdateringsid']
+        return updates, last_update_id
+
+    def fetch_companies(self, org_numbers):
+        """Current registry entries for the given org numbers (missing = deleted)"""
+        companies = {}
+        org_numbers = sorted(org_numbers)
+        for i in range(0, len(org_numbers), PAGE_SIZE):
+            batch = org_numbers[i:i + PAGE_SIZE]
+            params = {'organisasjonsnummer': ','.join(batch), 'size': PAGE_SIZE}
+            response = self.session.get(BRREG_ENHETER_URL, params=params, timeout=30)
+            self.requests_made += 1
+            response.raise_for_status()
+            for company in response.json().get('_embedded', {}).get('enheter', []):
+                companies[company.get('organisasjonsnummer', '')] = company
+        return companies
+
+    def sync(self, hotels, state, nace_codes, fylker, limit, should_continue=lambda: True):
+        """
+        Apply changes since state to hotels.
+        Returns (hotels, new_state, summary) with summary counts added/updated/removed.
+        """
+        self.requests_made = 0
+        by_org = {h['org_number']: h for h in hotels}
+        summary = {'added': 0, 'updated': 0, 'removed': 0, 'changes_seen': 0}
+
+        updates, last_update_id = self.fetch_updates(state.get('last_update_id'), state.get('since'), should_continue)
+        summary['changes_seen'] = len(updates)
+
+        deleted = set()
+        to_fetch = set()
+        for update in updates:
+            org = update.get('organisasjonsnummer', '')
+            if update.get('endringstype') in ('Sletting', 'Fjernet'):
+                deleted.add(org)
+                to_fetch.discard(org)
+            elif org in by_org or touches_nace(update, nace_codes):
+                to_fetch.add(org)
+                deleted.discard(org)
+
+        companies = self.fetch_companies(to_fetch) if to_fetch else {}
+
+        for org in deleted:
+            if by_org.pop(org, None):
+                summary['removed'] += 1
+
+        for org in sorted(to_fetch):
+            company = companies.get(org)
+            nace = matching_nace(company, nace_codes) if company else None
+            keep = company and nace and not company.get('slettedato') and in_region(company, fylker)
+
+            if not keep:
+                if by_org.pop(org, None):
+                    summary['removed'] += 1
+                continue
+
+            fresh = company_to_hotel(company, nace)
+            if org in by_org:
+                by_org[org].update({field: fresh[field] for field in BRREG_FIELDS})
+                summary['updated'] += 1
+            elif len(by_org) < limit:
+                by_org[org] = fresh
+                summary['added'] += 1
+
+        new_state = dict(state, last_update_id=last_update_id, last_sync=brreg_timestamp())
+        return list(by_org.values()), new_state, summary
@@ -0,0 +1,296 @@
+"""
+Headless command line for the Norway Hotel Database (no display needed)
+Discovery, enrichment and export with the same engines, local store, cache, journal
+and quota ledger as the GUIs, so jobs can run from cron or on a server. Progress is
+streamed to stdout as JSON lines ({"event": ...}); engine log output goes to stderr.
+Ctrl+C (SIGINT) or SIGTERM stops cleanly - discovery and enrichment resume where
+they left off on the next run, from the GUI or from here.
+
+Usage:
+    python cli.py discover --region Nord-Norge --types hotels,bb --limit 2000 --output hotels.xlsx
+    python cli.py discover --source dump --dump enheter_alle.json.gz --region "Hele Norge"
+    python cli.py discover --source delta --region Nord-Norge
+    python cli.py export --output hotels.xlsx
+    python cli.py enrich hotels.xlsx --output hotels_enriched.xlsx
+    python cli.py sharded --region "Hele Norge" --shards 8 --output norge.xlsx
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from brreg import DISCOVERY_WORKERS, NACE_CODES, REGIONS, SOURCE_API, SOURCE_BULK, SOURCE_DELTA, fylke_names
+from discovery_run import DiscoveryRun
+from excel_export import export_discovered, export_enriched, read_hotels_file
+from progress import ProgressModel
+from sharding import merge_shards, plan_shards, run_shards
+from storage import DiscoveryStore, EnrichmentJournal, file_job_id
+
+PROGRESS_INTERVAL = 1.0  # Seconds between progress events
+
+stop_requested = threading.Event()
+
+
+def should_continue():
+    return not stop_requested.is_set()
+
+
+class EventStream:
+    """One JSON object per line on stdout, flushed right away so pipes see it live"""
+
+    def __init__(self, out, progress):
+        self.out = out
+        self.progress = progress
+        self.lock = threading.Lock()
+        self.last_progress = 0.0
+
+    def emit(self, event, **fields):
+        line = json.dumps({'event': event, 'time': datetime.now().isoformat(timespec='seconds'), **fields},
+                          ensure_ascii=False, default=str)
+        with self.lock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+    def status(self, message):
+        self.emit('status', message=message)
+
+    def report_progress(self, force=False):
+        """A progress event, at most once per PROGRESS_INTERVAL unless forced"""
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self.last_progress < PROGRESS_INTERVAL:
+                return
+            self.last_progress = now
+        snap = self.progress.snapshot()
+        self.emit('progress',
+                  done=snap['job_done'], total=snap['job_total'], rows=snap['rows'],
+                  rate=round(snap['rate'], 2), eta=None if snap['eta'] is None else round(snap['eta']),
+                  statuses=snap['statuses'],
+                  sources={f"{source}:{outcome}": n for (source, outcome), n in snap['sources'].items()})
+
+
+# ---- discover ----
+
+DISCOVERY_SOURCES = {'api': SOURCE_API, 'dump': SOURCE_BULK, 'delta': SOURCE_DELTA}
+
+
+def discover(args, events):
+    store = DiscoveryStore()
+    progress = events.progress
+    nace_codes = [code for kind in args.types for code in NACE_CODES[kind]]
+
+    def on_start(hotels):
+        progress.reset(h.get('status', '') for h in hotels)
+        progress.start_job(max(0, args.limit - len(hotels)))
+
+    def on_hotel(hotel):
+        progress.add(hotel.get('status', ''))
+        progress.step()
+        events.report_progress()
+
+    run = DiscoveryRun(store, nace_codes, REGIONS[args.region], args.limit,
+                       should_continue=should_continue, on_status=events.status)
+    complete = run.run(DISCOVERY_SOURCES[args.source], on_start, on_hotel, workers=args.workers, dump=args.dump)
+    if run.report:
+        event, fields = run.report
+        events.emit(event, **fields)
+    if should_continue() and not complete:
+        events.status("Discovery incomplete - run discover again to fetch what failed")
+    return finish_discovery(store, args, events)
+
+
+def finish_discovery(store, args, events):
+    hotels = store.load_hotels()
+    events.progress.reset(h.get('status', '') for h in hotels)
+    events.report_progress(force=True)
+    if args.output:
+        exported = export_discovered(hotels, args.output)
+        events.emit('exported', path=args.output, rows=exported)
+    events.emit('done', hotels=len(hotels), stopped=not should_continue())
+    return 0
+
+
+# ---- export ----
+
+def export(args, events):
+    hotels = DiscoveryStore().load_hotels()
+    if not hotels:
+        events.emit('error', message="No discovered hotels in the local store")
+        return 1
+    exported = export_discovered(hotels, args.output)
+    events.emit('exported', path=args.output, rows=exported)
+    events.emit('done', hotels=exported)
+    return 0
+
+
+# ---- enrich ----
+
+def enrich(args, events):
+    # Imported here so discover/export don't set up the enrichment cache and sessions
+    from enrichment import AsyncEnrichmentEngine, HotelEnricher, record_result
+    import pandas as pd
+
+    input_df = read_hotels_file(args.input)
+    journal = EnrichmentJournal()
+    job = file_job_id(args.input)
+    if args.restart:
+        journal.clear(job)
+
+    # Same journal and job id as the GUI: rows finished there (or in an earlier run) are skipped
+    results, rows = journal.split_rows(job, [(idx, row) for idx, (_, row) in enumerate(input_df.iterrows())])
+
+    progress = events.progress
+    progress.reset(result.get('status', '') for result in results.values())
+    progress.start_job(len(rows))
+    events.status(f"Enriching {len(rows)} hotels ({len(results)} already done)")
+
+    enricher = HotelEnricher()
+    lock = threading.Lock()
+
+    def on_result(idx, result):
+        record_result(journal, job, idx, result, progress)
+        with lock:
+            results[idx] = result
+        events.report_progress()
+
+    engine = AsyncEnrichmentEngine(enricher, **({'hotels_in_flight': args.in_flight} if args.in_flight else {}))
+    asyncio.run(engine.run(rows, on_result, should_continue=should_continue))
+    events.report_progress(force=True)
+    events.emit('cache', stats=enricher.cache.stats_text(), paused_sources=enricher.paused_sources())
+
+    if args.output:
+        output_df = pd.DataFrame([results[idx] for idx in sorted(results)])
+        exported = export_enriched(output_df, args.output) if not output_df.empty else 0
+        events.emit('exported', path=args.output, rows=exported)
+    retry = sum(1 for result in results.values() if result.get('retry_sources'))
+    events.emit('done', hotels=len(results), total=len(input_df), retry_later=retry, stopped=not should_continue())
+    return 0
+
+
+# ---- sharded ----
+
+def sharded(args, events):
+    """Discovery and enrichment across worker processes, then one merged export"""
+    nace_codes = [code for kind in args.types for code in NACE_CODES[kind]]
+    hotels = None
+    if args.by == 'hash':
+        hotels = DiscoveryStore().load_hotels()
+        if not hotels:
+            events.emit('error', message="No discovered hotels in the local store - run discover first, or use --by fylke")
+            return 1
+
+    specs = plan_shards(args.by, args.shards, args.region, nace_codes, args.limit, args.workers, args.in_flight, hotels)
+    events.emit('shards', count=len(specs), by=args.by,
+                fylker=[spec['fylker'] for spec in specs] if args.by == 'fylke' else None,
+                names=[fylke_names(spec['fylker']) or "rest of Norway" for spec in specs] if args.by == 'fylke' else None)
+
+    progress = events.progress
+    progress.reset()
+    progress.start_job(0)  # Each shard adds its hotels once it knows them
+
+    def on_event(shard, kind, payload):
+        if kind == 'job':
+            progress.grow_job(payload['total'])
+        elif kind == 'result':
+            progress.add(payload)
+            progress.step()
+            events.report_progress()
+            return
+        elif kind in ('status', 'error'):
+            payload = {'message': payload}
+        events.emit(f"shard_{kind}", shard=shard + 1, **(payload or {}))
+
+    failed = run_shards(specs, on_event, should_continue)
+    events.report_progress(force=True)
+
+    rows = merge_shards(specs)
+    if args.output and rows:
+        import pandas as pd
+        exported = export_enriched(pd.DataFrame(rows), args.output)
+        events.emit('exported', path=args.output, rows=exported)
+    events.emit('done', hotels=len(rows), failed_shards=sorted(shard + 1 for shard in failed),
+                stopped=not should_continue())
+    return 1 if failed else 0
+
+
+def type_list(value):
+    return [kind.strip() for kind in value.split(',') if kind.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Norway Hotel Database - headless discovery, enrichment and export")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    discover_parser = commands.add_parser('discover', help="Find hotels in the Brreg registry")
+    discover_parser.add_argument('--region', choices=list(REGIONS), default="Nord-Norge")
+    discover_parser.add_argument('--types', default="hotels", type=type_list,
+                                 help=f"Comma-separated accommodation types: {', '.join(NACE_CODES)} (default: hotels)")
+    discover_parser.add_argument('--source', choices=['api', 'dump', 'delta'], default='api',
+                                 help="Brreg API, bulk dump, or changes since the last completed run")
+    discover_parser.add_argument('--dump', help="Local enheter dump (.json.gz) for --source dump; downloaded if omitted")
+    discover_parser.add_argument('--limit', type=int, default=300)
+    discover_parser.add_argument('--workers', type=int, default=DISCOVERY_WORKERS, help="Parallel Brreg requests")
+    discover_parser.add_argument('--output', help="Excel file to export the discovered hotels to")
+
+    export_parser = commands.add_parser('export', help="Export the discovered hotels in the local store")
+    export_parser.add_argument('--output', required=True)
+
+    enrich_parser = commands.add_parser('enrich', help="Enrich an Excel/CSV file (Google, Proff, TripAdvisor)")
+    enrich_parser.add_argument('input')
+    enrich_parser.add_argument('--output', help="Excel file for the results (also written after a stop)")
+    enrich_parser.add_argument('--restart', action='store_true', help="Ignore earlier progress on this file")
+    enrich_parser.add_argument('--in-flight', type=int, help="Hotels enriched at the same time")
+
+    sharded_parser = commands.add_parser('sharded', help="Discover and enrich across worker processes, then merge")
+    sharded_parser.add_argument('--region', choices=list(REGIONS), default="Hele Norge")
+    sharded_parser.add_argument('--types', default="hotels", type=type_list,
+                                help=f"Comma-separated accommodation types: {', '.join(NACE_CODES)} (default: hotels)")
+    sharded_parser.add_argument('--by', choices=['fylke', 'hash'], default='fylke',
+                                help="fylke: each process discovers and enriches its counties; "
+                                     "hash: the stored hotels are split by org_number")
+    sharded_parser.add_argument('--shards', type=int, default=os.cpu_count() or 4, help="Worker processes")
+    sharded_parser.add_argument('--limit', type=int, default=100000, help="Hotels discovered per shard at most")
+    sharded_parser.add_argument('--workers', type=int, default=DISCOVERY_WORKERS, help="Parallel Brreg requests per shard")
+    sharded_parser.add_argument('--in-flight', type=int, help="Hotels enriched at the same time per shard")
+    sharded_parser.add_argument('--output', help="Excel file for the merged results")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'sharded' and args.shards < 1:
+        build_parser().error("--shards must be at least 1")
+    if args.command in ('discover', 'sharded'):
+        unknown = [kind for kind in args.types if kind not in NACE_CODES]
+        if unknown:
+            build_parser().error(f"unknown type(s): {', '.join(unknown)} (choose from {', '.join(NACE_CODES)})")
+
+    events = EventStream(sys.stdout, ProgressModel())
+
+    def request_stop(signum, frame):
+        if not stop_requested.is_set():
+            stop_requested.set()
+            events.status("Stopping after the requests in flight...")
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    commands = {'discover': discover, 'export': export, 'enrich': enrich, 'sharded': sharded}
+    events.emit('start', command=args.command, args={k: v for k, v in vars(args).items() if k != 'command'})
+    try:
+        with contextlib.redirect_stdout(sys.stderr):  # Engine prints must not break the JSON stream
+            return commands[args.command](args, events)
+    except Exception as e:
+        events.emit('error', message=str(e))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
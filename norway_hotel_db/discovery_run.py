@@ -0,0 +1,157 @@
+"""
+One Brreg discovery run against the local store, shared by the scraper GUI, the CLI and shards
+Starts or resumes the store's run for a NACE/fylke selection and fills it from the Brreg
+API (page cursor checkpointed in the store), the bulk dump (saved in batches) or the
+update feed (delta sync). The run is closed only when nothing failed: a completed run
+is the baseline for the next delta sync, an incomplete one is resumed instead.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from brreg import (DISCOVERY_WORKERS, SOURCE_API, SOURCE_BULK, SOURCE_DELTA, BrregDeltaSync, BrregDiscovery,
+                   brreg_timestamp, iter_bulk_hotels, sync_filter)
+
+DUMP_SAVE_BATCH = 100  # Dump hotels written to the store per transaction
+
+
+class DiscoveryRun:
+    """
+    Callers get the hotel set the run starts from via on_start(hotels) (a resumed run's
+    stored hotels, or the delta-synced set) and each new hotel via on_hotel(hotel).
+    Afterwards, summary is a short text for a status bar and report an (event, fields)
+    pair with the numbers behind it, or None.
+    """
+
+    def __init__(self, store, nace_codes, fylker, limit, should_continue=lambda: True, on_status=None,
+                 exclude_fylker=()):
+        self.store = store
+        self.nace_codes = nace_codes
+        self.fylker = fylker
+        self.exclude_fylker = exclude_fylker  # API runs only: entities in these fylker are skipped
+        self.limit = limit
+        self.should_continue = should_continue
+        self.on_status = on_status
+        self.summary = ''
+        self.report = None
+
+    def status(self, message):
+        if self.on_status:
+            self.on_status(message)
+
+    def run(self, source, on_start, on_hotel, workers=DISCOVERY_WORKERS, dump=None):
+        """
+        Discover from source (SOURCE_API, SOURCE_BULK or SOURCE_DELTA; a delta without a
+        baseline for this selection falls back to the API). True if the run completed.
+        """
+        if source == SOURCE_DELTA:
+            applied = self.delta(on_start)
+            if applied is not None:
+                return applied
+            self.status("No previous sync for this region/type selection - running full discovery...")
+            source = SOURCE_API
+
+        hotels = self.begin(source)
+        on_start(list(hotels))
+        if source == SOURCE_BULK:
+            complete = self.from_dump(dump, hotels, on_hotel)
+        else:
+            complete = self.from_api(workers, hotels, on_hotel)
+
+        if self.should_continue() and complete:
+            self.store.finish_run()
+        return complete
+
+    def begin(self, source):
+        """Start the store's run for this selection, or resume it; the hotels it already has"""
+        if source == SOURCE_BULK:
+            # The dump is built nightly - replay a day of changes on the next delta sync
+            since = brreg_timestamp(datetime.now(timezone.utc) - timedelta(days=1))
+        else:
+            since = brreg_timestamp()
+
+        resumed = self.store.begin_run(sync_filter(self.nace_codes, self.fylker), source, since)
+        hotels = self.store.load_hotels() if resumed else []
+        if resumed:
+            self.status(f"Resuming discovery with {len(hotels)} hotels already found...")
+        return hotels
+
+    def from_api(self, workers, hotels, on_hotel):
+        """Query Brreg per NACE code x fylke in parallel. False if pages failed"""
+        self.status("Discovering hotels via Brreg API...")
+        engine = BrregDiscovery(max_workers=workers)
+        engine.discover(self.nace_codes, self.fylker, self.limit, on_hotel,
+                        should_continue=self.should_continue,
+                        on_status=self.on_status,
+                        completed_pages=self.store.completed_pages(),
+                        known_orgs=[h['org_number'] for h in hotels],
+                        on_page=self.store.complete_page,
+                        exclude_fylker=self.exclude_fylker)
+
+        self.summary = f" ({engine.pages_fetched} Brreg pages, {engine.pages_per_second():.1f} pages/s)"
+        if engine.failed_pages:
+            self.summary += f" - {len(engine.failed_pages)} Brreg pages failed, discover again to fetch them"
+        self.report = ('brreg', {'pages': engine.pages_fetched,
+                                 'pages_per_second': round(engine.pages_per_second(), 2),
+                                 'failed_pages': len(engine.failed_pages)})
+        return not engine.failed_pages
+
+    def from_dump(self, dump, hotels, on_hotel):
+        """Stream the Brreg bulk dump, filtering by NACE and kommune while reading. False if the stream failed"""
+        self.status(f"Streaming Brreg dump {'from ' + os.path.basename(dump) if dump else '(download)'}...")
+        seen_orgs = {h['org_number'] for h in hotels}  # Resumed runs skip what is already stored
+        batch = []
+        try:
+            for hotel in iter_bulk_hotels(dump, self.nace_codes, self.fylker, should_continue=self.should_continue):
+                if len(seen_orgs) >= self.limit:
+                    break
+                if hotel['org_number'] in seen_orgs:
+                    continue
+                seen_orgs.add(hotel['org_number'])
+                on_hotel(hotel)
+
+                batch.append(hotel)
+                if len(batch) >= DUMP_SAVE_BATCH:
+                    self.store.save_hotels(batch)
+                    batch = []
+
+        except Exception as e:
+            print(f"Brreg dump error: {e}")
+            self.status(f"Brreg dump error: {str(e)[:60]}")
+            self.summary = " - the Brreg dump stopped with an error, discover again to resume"
+            self.report = ('error', {'message': f"Brreg dump error: {e}"})
+            return False
+        finally:
+            self.store.save_hotels(batch)
+        return True
+
+    def delta(self, on_start):
+        """
+        Apply Brreg's update feed to the stored set of the last completed run.
+        None if there is no such baseline for this selection, else whether the changes were applied.
+        """
+        run = self.store.get_run()
+        if not run or not run.get('complete') or run.get('filter') != sync_filter(self.nace_codes, self.fylker):
+            return None
+
+        self.status(f"Fetching Brreg changes since {run.get('last_sync') or run.get('since')}...")
+        base = self.store.load_hotels()
+        try:
+            sync = BrregDeltaSync()
+            hotels, new_run, summary = sync.sync(base, run, self.nace_codes, self.fylker, self.limit,
+                                                 should_continue=self.should_continue)
+        except Exception as e:
+            print(f"Brreg delta error: {e}")
+            self.status(f"Brreg delta error: {str(e)[:60]}")
+            self.report = ('error', {'message': f"Brreg delta error: {e}"})
+            hotels, new_run = base, None
+
+        if new_run is not None:
+            self.store.replace_hotels(hotels)
+            self.store.set_meta('run', new_run)
+            self.summary = (f" (+{summary['added']} new, {summary['updated']} changed, "
+                            f"-{summary['removed']} removed from {summary['changes_seen']} "
+                            f"registry changes in {sync.requests_made} requests)")
+            self.report = ('delta', {'requests': sync.requests_made, **summary})
+        on_start(list(hotels))
+        return new_run is not None
@@ -0,0 +1,584 @@
+"""
+Enrichment engine for the Norway Hotel Database
+Google Places, Proff.no and TripAdvisor lookups for one hotel row, plus an
+asyncio engine that runs the sources for many hotels concurrently.
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from enrichment_cache import EnrichmentCache
+from html_parsing import embedded_json, find_json_value, json_objects, json_scalar, page_text, parse_offloaded
+from http_client import REPLAY, create_session
+from quota import QuotaLedger
+from resilience import CircuitBreaker, SourceUnavailable
+
+# ============================================================
+# CONFIGURATION - Add your API keys here
+# ============================================================
+GOOGLE_PLACES_API_KEY = os.environ.get("GOOGLE_PLACES_API_KEY", "")  # Or paste your key here
+PROFF_API_KEY = os.environ.get("PROFF_API_KEY", "")  # Proff.no API key (if you have trial)
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'no,en;q=0.9',
+}
+
+# List of user agents to rotate (human-like behavior)
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
+]
+
+# Per-source concurrency: how many requests to each source may be in flight at once
+SOURCE_LIMITS = {
+    'google': 8,
+    'proff': 3,
+    'tripadvisor': 3,
+}
+HOTELS_IN_FLIGHT = 16  # Hotels being enriched at the same time
+
+GOOGLE_FIND_PLACE_URL = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
+GOOGLE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACE_ID_ATTEMPTS = 2  # A stale cached place_id is resolved again once
+PLACE_NOT_FOUND = object()  # Place Details answered NOT_FOUND
+
+# Result column -> (Place Details field, billing category). A Details request is billed
+# for the categories its field mask touches, so only missing columns are asked for.
+GOOGLE_DETAIL_FIELDS = {
+    'commercial_name': ('name', 'basic'),
+    'phone': ('formatted_phone_number', 'contact'),
+    'website': ('website', 'contact'),
+    'google_rating': ('rating', 'atmosphere'),
+}
+
+SOURCE_NAMES = {'google': 'Google', 'proff': 'Proff', 'tripadvisor': 'TripAdvisor'}
+
+# Keys in the pages' embedded JSON (__NEXT_DATA__ / ld+json), tried before the text patterns
+PROFF_JSON_PERSON_KEYS = ('ceo', 'dagligLeder', 'managingDirector', 'generalManager')
+PROFF_JSON_REVENUE_KEYS = ('revenue', 'operatingRevenue', 'totalOperatingIncome', 'salesRevenue', 'driftsinntekter')
+PROFF_JSON_ROLE_RE = re.compile(r'daglig leder|styreleder|\bceo\b', re.IGNORECASE)
+TRIPADVISOR_JSON_ROOM_KEYS = ('numberOfRooms', 'roomCount', 'numRooms')
+TRIPADVISOR_JSON_STAR_KEYS = ('starRating', 'hotelClass')
+
+# Patterns over page text (see html_parsing.py)
+PROFF_ROLE_RE = re.compile(r'(?i:Daglig leder|Styreleder)[:\s]+([A-ZÆØÅ][a-zæøå]+ [A-ZÆØÅ][a-zæøå]+)')
+PROFF_REVENUE_RE = re.compile(r'(?i:Driftsinntekter|Omsetning|Salgsinntekt)\D{0,40}?(\d{1,3}(?:[ \u00a0.,]\d{3})+|\d+)')
+TRIPADVISOR_ROOMS_RE = re.compile(r'(\d+)\s*(?:rooms?|rom|værelser?)', re.IGNORECASE)
+TRIPADVISOR_STARS_RE = re.compile(r'(\d(?:\.\d)?)\s*(?:star|stjerne)', re.IGNORECASE)
+
+
+class PlaceIdExpired(Exception):
+    """Place Details no longer knows a (cached) place_id"""
+
+
+def proff_json_person(payloads):
+    """CEO/chair from Proff's page data: a ceo-like key, or a role entry {"title": "Daglig leder", "name": ..}"""
+    person = find_json_value(payloads, PROFF_JSON_PERSON_KEYS)
+    if person:
+        return person
+    for payload in payloads:
+        for obj in json_objects(payload):
+            role = obj.get('role') or obj.get('title') or obj.get('roleName')
+            if isinstance(role, str) and PROFF_JSON_ROLE_RE.search(role) and obj.get('name'):
+                return json_scalar(obj['name'])
+    return ''
+
+
+def parse_proff_page(content):
+    """Owner/CEO and revenue from a Proff.no company page, or None"""
+    payloads = embedded_json(content)
+    result = {}
+
+    owner = proff_json_person(payloads)
+    revenue = find_json_value(payloads, PROFF_JSON_REVENUE_KEYS)
+
+    if not (owner and revenue):
+        text = page_text(content)
+
+        # Name after the role label (Daglig leder / Styreleder)
+        match = None if owner else PROFF_ROLE_RE.search(text)
+        if match:
+            owner = match.group(1)
+
+        # First amount after the revenue label (Driftsinntekter)
+        match = None if revenue else PROFF_REVENUE_RE.search(text)
+        if match:
+            revenue = match.group(1)
+
+    if owner:
+        result['owner'] = owner
+        result['daglig_leder'] = owner
+    if revenue:
+        result['revenue'] = revenue
+
+    return result if result else None
+
+
+def parse_tripadvisor_search(content, search_url):
+    """Rooms (or at least stars) from a TripAdvisor search result page"""
+    payloads = embedded_json(content)
+    rooms = find_json_value(payloads, TRIPADVISOR_JSON_ROOM_KEYS)
+    stars = find_json_value(payloads, TRIPADVISOR_JSON_STAR_KEYS)
+
+    if not rooms:
+        text = page_text(content)
+
+        # Pattern: "123 rooms" or "123 rom"
+        room_match = TRIPADVISOR_ROOMS_RE.search(text)
+        if room_match:
+            rooms = room_match.group(1)
+        elif not stars:
+            star_match = TRIPADVISOR_STARS_RE.search(text)
+            stars = star_match.group(1) if star_match else ''
+
+    if rooms:
+        return {
+            'rooms': rooms,
+            'stars': stars,
+            'url': search_url
+        }
+
+    return {
+        'rooms': '',
+        'stars': stars,
+        'url': ''
+    }
+
+
+class HotelEnricher:
+    """Lookups for one hotel row. Thread-safe, so rows can be enriched concurrently."""
+
+    def __init__(self, cache=None, ledger=None):
+        self.cache = cache or EnrichmentCache(reuse=not REPLAY)  # Replay re-parses archived pages
+        self.ledger = ledger or QuotaLedger()  # Shared with hotel_scraper_full.py
+        self.session = create_session(pool_size=max(SOURCE_LIMITS.values()))  # Paced per host
+        self.breakers = {source: CircuitBreaker(source) for source in SOURCE_LIMITS}
+
+    def new_result(self, row):
+        """Output record for an input row, all columns initialized"""
+        result = {
+            'org_number': str(row.get('org_number', '')),
+            'legal_name': str(row.get('legal_name', '')),
+            'commercial_name': '',
+            'address': str(row.get('address', '')),
+            'municipality': str(row.get('municipality', '')),
+            'property_type': str(row.get('property_type', '')),
+            'stars': '',
+            'rooms': '',
+            'brand': '',
+            'operator': '',
+            'owner': '',
+            'board_members': '',
+            'revenue': '',
+            'google_rating': '',
+            'tripadvisor_url': '',
+            'website': '',
+            'phone': '',
+            'email': '',
+            'data_source': '',
+            'retry_sources': '',
+            'last_updated': datetime.now().strftime('%Y-%m-%d'),
+            'status': 'Pending'
+        }
+        # Keep Google fields the input already has (e.g. a re-run on an exported file)
+        for column in GOOGLE_DETAIL_FIELDS:
+            value = str(row.get(column, '')).strip()
+            if value and value.lower() not in ('nan', 'none'):
+                result[column] = value
+        return result
+
+    def missing_google_columns(self, result):
+        return [column for column in GOOGLE_DETAIL_FIELDS if not result[column]]
+
+    def apply_google(self, result, google_data, sources_found):
+        """Fill the columns that were missing from Place Details fields"""
+        if google_data:
+            for column, (field, _) in GOOGLE_DETAIL_FIELDS.items():
+                if not result[column] and google_data.get(field) not in (None, ''):
+                    result[column] = google_data[field]
+            if result['google_rating']:
+                result['stars'] = self.rating_to_stars(result['google_rating'])
+            sources_found.append('Google')
+
+    def lookup_proff(self, org_number):
+        """Proff.no via API if we have a key, else scraping"""
+        if not org_number or len(org_number.replace(' ', '')) < 9:
+            return None
+        if PROFF_API_KEY:
+            return self.lookup_proff_api(org_number)
+        return self.lookup_proff_scrape(org_number)
+
+    def apply_proff(self, result, proff_data, sources_found):
+        if proff_data:
+            result['owner'] = proff_data.get('owner', '')
+            result['board_members'] = proff_data.get('board', '')
+            result['revenue'] = proff_data.get('revenue', '')
+            result['operator'] = proff_data.get('daglig_leder', '')
+            sources_found.append('Proff')
+
+    def apply_tripadvisor(self, result, tripadvisor_data, sources_found):
+        if tripadvisor_data:
+            result['rooms'] = tripadvisor_data.get('rooms', '')
+            result['tripadvisor_url'] = tripadvisor_data.get('url', '')
+            if not result['stars']:
+                result['stars'] = tripadvisor_data.get('stars', '')
+            sources_found.append('TripAdvisor')
+
+    def finish_result(self, result, sources_found, retry_sources=()):
+        """Brand, data source and status once all sources have answered"""
+        result['brand'] = self.detect_brand(result['commercial_name'] or result['legal_name'])
+
+        # Set status and data source
+        result['data_source'] = ', '.join(sources_found) if sources_found else 'None'
+        result['retry_sources'] = ', '.join(retry_sources)
+        if retry_sources:
+            # A source failed or was paused - not a real "no data", look it up again later
+            result['status'] = 'Partial' if sources_found else 'Retry later'
+        elif sources_found:
+            result['status'] = 'Complete ✓' if len(sources_found) >= 2 else 'Partial'
+        else:
+            result['status'] = 'No data'
+        return result
+
+    def fetch_guarded(self, source, fetch):
+        """fetch() with retries behind the source's circuit breaker"""
+        return self.breakers[source].call(fetch)
+
+    def paused_sources(self):
+        return [SOURCE_NAMES[source] for source, breaker in self.breakers.items() if breaker.is_open]
+
+    def rating_to_stars(self, rating):
+        """Convert Google rating to star category"""
+        try:
+            r = float(rating)
+            if r >= 4.5:
+                return '5'
+            elif r >= 4.0:
+                return '4'
+            elif r >= 3.5:
+                return '3'
+            elif r >= 3.0:
+                return '2'
+            else:
+                return '1'
+        except:
+            return ''
+
+    def detect_brand(self, name):
+        """Detect hotel brand from name"""
+        brands = {
+            'Thon': 'Thon Hotels',
+            'Scandic': 'Scandic',
+            'Clarion': 'Nordic Choice',
+            'Comfort': 'Nordic Choice',
+            'Quality': 'Nordic Choice',
+            'Radisson': 'Radisson',
+            'Hilton': 'Hilton',
+            'Best Western': 'Best Western',
+            'Smarthotel': 'Smarthotel',
+            'Citybox': 'Citybox',
+            'First': 'First Hotels',
+            'Rica': 'Scandic',
+            'P-Hotels': 'P-Hotels',
+        }
+
+        name_upper = name.upper()
+        for key, brand in brands.items():
+            if key.upper() in name_upper:
+                return brand
+        return ''
+
+    def lookup_google_places(self, name, address, missing=tuple(GOOGLE_DETAIL_FIELDS)):
+        """
+        Two-tier Google Places lookup (both tiers cached). Raises if Google couldn't answer.
+        1. Find Place asking for place_id only - the cheapest request, and the place_id
+           is cached for a year, so repeat runs skip this step entirely.
+        2. Place Details with a field mask of just the missing columns.
+        Returns {Place Details field: value}, or None when there is no match.
+        """
+        if not GOOGLE_PLACES_API_KEY:
+            return None
+
+        fields = sorted({GOOGLE_DETAIL_FIELDS[column][0] for column in missing})
+        if not fields:
+            return None
+
+        # Clean up legal name for search (AVD: branches resolve to the same place as the main entity)
+        search_name = re.sub(r'\b(AS|ANS|DA|ENK|DRIFT|AVD)\b', '', name, flags=re.IGNORECASE).strip()
+        query = f"{search_name} {address} Norway"
+
+        field_mask = ','.join(fields)
+        for attempt in range(PLACE_ID_ATTEMPTS):
+            # Keyed on the query, not org_number, so entities with identical queries share one call
+            place_id = self.cache.get_or_fetch(
+                'google_place_id', query,
+                lambda: self.fetch_guarded('google', lambda: self.fetch_place_id(query))
+            )
+            if not place_id:
+                return None
+
+            try:
+                return self.cache.get_or_fetch(
+                    'google_details', f"{place_id}|{field_mask}",
+                    lambda: self.fetch_details(place_id, field_mask)
+                )
+            except PlaceIdExpired:
+                # Places move and merge: forget the old id so Find Place resolves the hotel again
+                print(f"Google place_id {place_id} no longer exists - looking '{query}' up again")
+                self.cache.delete('google_place_id', query)
+        return None
+
+    def fetch_details(self, place_id, field_mask):
+        """Place Details behind the breaker; PlaceIdExpired (so nothing is cached) if the id is gone"""
+        details = self.fetch_guarded('google', lambda: self.fetch_place_details(place_id, field_mask))
+        if details is PLACE_NOT_FOUND:
+            raise PlaceIdExpired(place_id)
+        return details
+
+    def google_request(self, url, params):
+        """One Places API request against the daily quota; raises on errors so they aren't cached"""
+        if not REPLAY and not self.ledger.try_spend('google', GOOGLE_PLACES_API_KEY):
+            raise RuntimeError("free daily quota used up")
+
+        response = self.session.get(url, params={**params, 'key': GOOGLE_PLACES_API_KEY}, timeout=10)
+        response.raise_for_status()  # 5xx is retried, not mistaken for 'no match'
+        data = response.json()
+
+        if data.get('status') not in ('OK', 'ZERO_RESULTS', 'NOT_FOUND'):
+            raise RuntimeError(f"status {data.get('status')}: {data.get('error_message', '')}")
+        return data
+
+    def fetch_place_id(self, query):
+        """Find Place with the place_id field only (ID-only request)"""
+        data = self.google_request(GOOGLE_FIND_PLACE_URL, {
+            'input': query,
+            'inputtype': 'textquery',
+            'fields': 'place_id',
+        })
+        candidates = data.get('candidates') or []
+        return candidates[0].get('place_id') if candidates else None
+
+    def fetch_place_details(self, place_id, field_mask):
+        """Place Details for the given fields only; PLACE_NOT_FOUND if Google no longer knows place_id"""
+        data = self.google_request(GOOGLE_DETAILS_URL, {
+            'place_id': place_id,
+            'fields': field_mask,
+        })
+        if data.get('status') == 'NOT_FOUND':
+            return PLACE_NOT_FOUND  # A success for the breaker; fetch_details turns it into PlaceIdExpired
+        return data.get('result') or None
+
+    def lookup_proff_api(self, org_number):
+        """Lookup company using Proff.no API (cached). Raises if Proff couldn't answer"""
+        if not PROFF_API_KEY:
+            return None
+
+        org_number = re.sub(r'\D', '', str(org_number))
+        return self.cache.get_or_fetch(
+            'proff', f"api|{org_number}",
+            lambda: self.fetch_guarded('proff', lambda: self.fetch_proff_api(org_number))
+        )
+
+    def fetch_proff_api(self, org_number):
+        # Proff.no API endpoint (adjust based on actual API docs)
+        url = f"https://api.proff.no/api/companies/NO/{org_number}"
+        headers = {
+            'Authorization': f'Bearer {PROFF_API_KEY}',
+            'Accept': 'application/json'
+        }
+
+        response = self.session.get(url, headers=headers, timeout=10)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        data = response.json()
+        return {
+            'owner': data.get('ceo', {}).get('name', ''),
+            'daglig_leder': data.get('ceo', {}).get('name', ''),
+            'board': ', '.join([m.get('name', '') for m in data.get('boardMembers', [])[:3]]),
+            'revenue': data.get('financials', {}).get('revenue', ''),
+        }
+
+    def lookup_proff_scrape(self, org_number):
+        """Lookup company by scraping Proff.no (cached). Raises when blocked or unreachable"""
+        org_number = re.sub(r'\D', '', str(org_number))
+        if len(org_number) != 9:
+            return None
+
+        return self.cache.get_or_fetch(
+            'proff', f"scrape|{org_number}",
+            lambda: self.fetch_guarded('proff', lambda: self.fetch_proff_page(org_number))
+        )
+
+    def fetch_proff_page(self, org_number):
+        """Scrape one Proff.no company page; raises when blocked so the miss isn't cached"""
+        url = f"https://www.proff.no/selskap/-/-/{org_number}"
+
+        headers = {**HEADERS, 'User-Agent': random.choice(USER_AGENTS)}
+        response = self.session.get(url, headers=headers, timeout=10)
+
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        return parse_offloaded(parse_proff_page, response.content)  # Parsed on the pool, not this I/O thread
+
+    def lookup_tripadvisor_humanlike(self, name, address):
+        """
+        Human-like TripAdvisor lookup for room count (cached)
+        Paced by the TripAdvisor rate budget, with varied user agents.
+        Raises when blocked or unreachable.
+        """
+        # Clean name for search
+        search_name = re.sub(r'\b(AS|ANS|DA|ENK|DRIFT|HOTELL?)\b', '', name, flags=re.IGNORECASE).strip()
+
+        return self.cache.get_or_fetch(
+            'tripadvisor', search_name,
+            lambda: self.fetch_guarded('tripadvisor', lambda: self.fetch_tripadvisor_search(search_name))
+        )
+
+    def fetch_tripadvisor_search(self, search_name):
+        """Search TripAdvisor and pull rooms/stars from the result page; raises when blocked"""
+        # Random user agent
+        headers = {
+            'User-Agent': random.choice(USER_AGENTS),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5,no;q=0.3',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Cache-Control': 'max-age=0',
+        }
+
+        # First, search for the hotel
+        search_url = f"https://www.tripadvisor.com/Search?q={search_name.replace(' ', '+')}&geo=190455"
+
+        response = self.session.get(search_url, headers=headers, timeout=15)
+        response.raise_for_status()
+
+        return parse_offloaded(parse_tripadvisor_search, response.content, search_url)
+
+
+class AsyncEnrichmentEngine:
+    """
+    Enriches many hotels at once on an asyncio loop.
+    Per hotel, Proff runs alongside Google -> TripAdvisor (TripAdvisor searches
+    on the Google name). Blocking lookups run in worker threads, and a semaphore
+    per source caps how many requests each site sees at the same time.
+    """
+
+    def __init__(self, enricher, hotels_in_flight=HOTELS_IN_FLIGHT, source_limits=None):
+        self.enricher = enricher
+        self.hotels_in_flight = hotels_in_flight
+        self.source_limits = {**SOURCE_LIMITS, **(source_limits or {})}
+
+    async def call(self, source, fn, *args):
+        async with self.semaphores[source]:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def lookup(self, source, retry_sources, fn, *args):
+        """A lookup's data, or None - noting the source for a later retry if it failed"""
+        try:
+            return await self.call(source, fn, *args)
+        except Exception as e:
+            if not isinstance(e, SourceUnavailable):
+                print(f"{SOURCE_NAMES[source]} error: {e}")
+            retry_sources.append(SOURCE_NAMES[source])
+            return None
+
+    async def enrich_row(self, row):
+        enricher = self.enricher
+        result = enricher.new_result(row)
+        legal_name = result['legal_name']
+        address = result['address']
+        google_sources = []
+        proff_sources = []
+        retry_sources = []
+
+        async def google_then_tripadvisor():
+            missing = enricher.missing_google_columns(result)
+            if GOOGLE_PLACES_API_KEY and missing:
+                google_data = await self.lookup('google', retry_sources, enricher.lookup_google_places,
+                                                legal_name, address, missing)
+                enricher.apply_google(result, google_data, google_sources)
+
+            search_name = result['commercial_name'] or legal_name
+            if search_name:
+                tripadvisor_data = await self.lookup('tripadvisor', retry_sources,
+                                                     enricher.lookup_tripadvisor_humanlike, search_name, address)
+                enricher.apply_tripadvisor(result, tripadvisor_data, google_sources)
+
+        async def proff():
+            proff_data = await self.lookup('proff', retry_sources, enricher.lookup_proff, result['org_number'])
+            enricher.apply_proff(result, proff_data, proff_sources)
+
+        await asyncio.gather(google_then_tripadvisor(), proff())
+
+        # Keep the original source order: Google, Proff, TripAdvisor
+        order = list(SOURCE_NAMES.values())
+        sources_found = [s for s in order if s in google_sources + proff_sources]
+        return enricher.finish_result(result, sources_found, [s for s in order if s in retry_sources])
+
+    async def run(self, rows, on_result, should_continue=lambda: True):
+        """
+        Enrich (index, row) pairs, calling on_result(index, result) as each hotel finishes.
+        Stops taking new hotels once should_continue() is False.
+        """
+        self.semaphores = {source: asyncio.Semaphore(limit) for source, limit in self.source_limits.items()}
+        self.executor = ThreadPoolExecutor(max_workers=sum(self.source_limits.values()))
+        rows = iter(rows)
+
+        async def worker():
+            for idx, row in rows:
+                if not should_continue():
+                    return
+                result = await self.enrich_row(row)
+                on_result(idx, result)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.hotels_in_flight)))
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def run_in_thread(self, rows, on_result, should_continue=lambda: True, on_done=None):
+        """Run the engine on its own event loop in a daemon thread (keeps the Tk loop free)"""
+        def target():
+            try:
+                asyncio.run(self.run(rows, on_result, should_continue))
+            finally:
+                if on_done:
+                    on_done()
+
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
+def record_result(journal, job, idx, result, progress=None):
+    """
+    Bookkeeping for a finished row, shared by the enricher GUI, the CLI and shards.
+    Journaled first - once that commits the row survives a crash - and complete only
+    if no source is left to retry; then its status and sources are counted on progress.
+    """
+    journal.record(job, journal.row_key(result['org_number'], idx), idx, result,
+                   complete=not result.get('retry_sources'))
+    if progress is None:
+        return
+    progress.add(result.get('status', ''))
+    for source in filter(None, result.get('data_source', '').split(', ')):
+        if source != 'None':
+            progress.record_source(source, 'found')
+    for source in filter(None, result.get('retry_sources', '').split(', ')):
+        progress.record_source(source, 'retry')
+    progress.step()
@@ -0,0 +1,184 @@
+"""
+Persistent cache of enrichment lookups (Google Places, Proff.no, TripAdvisor)
+Shared by hotel_scraper_full.py and hotel_enricher.py through hotel_data/enrichment_cache.db,
+so hotels resolved yesterday don't spend today's quota again. Identical queries in flight
+at the same time are coalesced, so each one goes out once.
+"""
+
+import json
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+
+from storage import connect, get_data_path
+
+CACHE_DB = "enrichment_cache.db"
+
+DAY = 24 * 60 * 60
+
+# How long a result stays valid, per source
+CACHE_TTL = {
+    'google': 30 * DAY,
+    'google_place_id': 365 * DAY,  # Place IDs are stable; Google suggests refreshing after 12 months
+    'google_details': 30 * DAY,
+    'google_area': 30 * DAY,
+    'proff': 90 * DAY,  # Financials change once a year
+    'tripadvisor': 30 * DAY,
+}
+DEFAULT_TTL = 30 * DAY
+NEGATIVE_TTL = 7 * DAY  # "No match" is cached too, but rechecked sooner
+
+CACHE_MAX_BYTES = 50 * 1024 * 1024  # Least recently used entries are evicted above this
+
+
+def normalize_query(query):
+    """Cache key for a lookup: case, Unicode form, punctuation and spacing don't matter"""
+    query = unicodedata.normalize('NFKC', str(query)).casefold()
+    return ' '.join(re.sub(r'[^\w|]+', ' ', query).split())
+
+
+class EnrichmentCache:
+    def __init__(self, path=None, ttl=None, max_bytes=CACHE_MAX_BYTES, reuse=True):
+        self.conn = connect(path or get_data_path(CACHE_DB))
+        self.lock = threading.Lock()
+        self.ttl = {**CACHE_TTL, **(ttl or {})}
+        self.max_bytes = max_bytes
+        self.reuse = reuse  # False: look everything up again (replay), but still share this run's results
+        self.hits = 0
+        self.misses = 0
+        self.in_flight = {}  # (source, key) -> Future of the fetch in progress
+        self.fetched = set()  # Keys fetched by this process, to tell duplicates from older cache entries
+        self.coalesced = 0  # Lookups answered by another row's call instead of their own
+
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    source TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (source, key)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+            self.conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, source, query, count=True):
+        """Returns (found, value); value may be None for a cached 'no match'. count=False leaves hits/misses alone"""
+        key = normalize_query(query)
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT value FROM cache WHERE source = ? AND key = ? AND expires_at >= ?",
+                (source, key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += count
+                return False, None
+            self.conn.execute("UPDATE cache SET last_access = ? WHERE source = ? AND key = ?", (now, source, key))
+            self.hits += count
+        return True, json.loads(row[0])
+
+    def put(self, source, query, value):
+        key = normalize_query(query)
+        data = json.dumps(value, ensure_ascii=False)
+        ttl = self.ttl.get(source, DEFAULT_TTL) if value else NEGATIVE_TTL
+        now = time.time()
+
+        with self.lock, self.conn:
+            old = self.conn.execute("SELECT size FROM cache WHERE source = ? AND key = ?", (source, key)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (source, key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, key, data, len(data), now + ttl, now)
+            )
+            self.total_bytes += len(data) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def delete(self, source, query):
+        """Drop a cached value that turned out to be wrong (a place_id Google no longer knows)"""
+        key = normalize_query(query)
+        with self.lock, self.conn:
+            old = self.conn.execute("SELECT size FROM cache WHERE source = ? AND key = ?", (source, key)).fetchone()
+            if old:
+                self.conn.execute("DELETE FROM cache WHERE source = ? AND key = ?", (source, key))
+                self.total_bytes -= old[0]
+
+    def evict(self):
+        """Drop expired, then least recently used entries until 90% of max_bytes (lock held)"""
+        self.conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+        target = self.max_bytes * 0.9
+        while self.total_bytes > target:
+            rows = self.conn.execute("SELECT source, key, size FROM cache ORDER BY last_access LIMIT 500").fetchall()
+            if not rows:
+                break
+            for source, key, size in rows:
+                self.conn.execute("DELETE FROM cache WHERE source = ? AND key = ?", (source, key))
+                self.total_bytes -= size
+                if self.total_bytes <= target:
+                    break
+
+    def get_or_fetch(self, source, query, fetch):
+        """
+        Cached value for query, or fetch() and cache the result.
+        Single-flight: while one thread fetches a query, other threads asking for the
+        same normalized query wait for its result (or its exception) instead of calling too.
+        Exceptions from fetch() propagate and nothing is cached, so
+        blocks and quota errors are retried next time.
+        """
+        flight = (source, normalize_query(query))
+        found, value = self.get(source, query) if self.reuse or flight in self.fetched else (False, None)
+        if found:
+            if flight in self.fetched:
+                with self.lock:
+                    self.coalesced += 1
+            return value
+
+        with self.lock:
+            future = self.in_flight.get(flight)
+            leader = future is None
+            if leader:
+                future = self.in_flight[flight] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        # A previous leader may have landed between our cache check and taking the lock
+        if flight in self.fetched:
+            found, value = self.get(source, query, count=False)
+            if found:
+                with self.lock:
+                    self.coalesced += 1
+                    del self.in_flight[flight]
+                future.set_result(value)
+                return value
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[flight]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.fetched.add(flight)
+        self.put(source, query, value)  # Cached before the flight lands, so late callers hit the cache
+        with self.lock:
+            del self.in_flight[flight]
+        future.set_result(value)
+        return value
+
+    def stats_text(self):
+        text = f"Cache: {self.hits} hits / {self.misses} misses"
+        if self.coalesced:
+            text += f" | Duplicate queries coalesced: {self.coalesced} calls saved"
+        return text
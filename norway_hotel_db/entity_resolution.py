@@ -0,0 +1,127 @@
+"""
+Entity resolution for discovered hotels
+One physical hotel is often several Brreg entities (operating company, property
+company, AVD branches). Candidates are found through blocking keys - street address,
+and name tokens within a postnummer or kommune - so records are only compared inside
+small blocks, never all pairs. An address shared by many entities (a Postboks, an
+accountant's office) is split further by name token, and names must share a word to
+match. Matches are clustered with union-find, and one representative per cluster is
+enriched for all of them.
+"""
+
+import re
+from collections import defaultdict
+
+from area_harvest import name_tokens, postcode, street, token_similarity
+
+SAME_ADDRESS_SIMILARITY = 0.7  # Same street address: names only need to be close
+SAME_AREA_SIMILARITY = 0.9  # Same postnummer/kommune only: names must be near-identical
+MAX_BLOCK_SIZE = 200  # Tokens shared by more records than this (e.g. a chain name) don't block
+MAX_ADDRESS_BLOCK = 50  # Bigger address blocks are only compared within shared name tokens
+
+PROPAGATED_FIELDS = ('commercial_name', 'google_rating', 'stars', 'brand', 'phone', 'website', 'status')
+
+SECONDARY_ENTITY = re.compile(r'\b(eiendom|holding|invest|avd|avdeling)\b', re.IGNORECASE)
+
+
+def features(hotel):
+    """(name tokens, postnummer, street, kommune) used for blocking and comparison"""
+    municipality = str(hotel.get('municipality', '')).casefold()
+    address = hotel.get('address', '')
+    return (
+        name_tokens(hotel.get('legal_name', ''), set(name_tokens(municipality))),
+        postcode(address),
+        street(address),
+        municipality,
+    )
+
+
+def blocking_keys(feature):
+    tokens, post, street_name, municipality = feature
+    keys = []
+    if post and street_name:
+        keys.append(('address', post, street_name))
+    area = post or municipality
+    if area:
+        keys.extend(('name', area, token) for token in set(tokens))
+    if municipality and municipality != area:
+        keys.extend(('name', municipality, token) for token in set(tokens))
+    return keys
+
+
+def is_duplicate(a, b):
+    if not set(a[0]) & set(b[0]):
+        return False  # Spelling alone chains numbered names together (Firma1 AS, Firma2 AS, ...)
+    similarity = token_similarity(a[0], b[0])
+    same_address = a[1] and a[2] and (a[1], a[2]) == (b[1], b[2])
+    return similarity >= (SAME_ADDRESS_SIMILARITY if same_address else SAME_AREA_SIMILARITY)
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def representative(hotels, members):
+    """Prefer the operating entity over property/holding companies and branches, then list order"""
+    return min(members, key=lambda i: (bool(SECONDARY_ENTITY.search(hotels[i].get('legal_name', ''))), i))
+
+
+def resolve_entities(hotels):
+    """
+    Cluster duplicate entities. Returns {representative index: [other member indexes]}
+    for clusters of two or more; every other hotel stands alone.
+    """
+    feats = [features(hotel) for hotel in hotels]
+
+    blocks = defaultdict(list)
+    for i, feature in enumerate(feats):
+        for key in blocking_keys(feature):
+            blocks[key].append(i)
+
+    # A crowded address is compared per name token at that address, not all pairs
+    for key in [key for key, block in blocks.items() if key[0] == 'address' and len(block) > MAX_ADDRESS_BLOCK]:
+        for i in blocks.pop(key):
+            for token in set(feats[i][0]):
+                blocks[('address_name', key[1], key[2], token)].append(i)
+
+    union_find = UnionFind(len(hotels))
+    compared = set()
+    for key, block in blocks.items():
+        if len(block) < 2 or len(block) > MAX_BLOCK_SIZE:
+            continue
+        for n, i in enumerate(block):
+            for j in block[n + 1:]:
+                if (i, j) in compared:
+                    continue
+                compared.add((i, j))
+                if is_duplicate(feats[i], feats[j]):
+                    union_find.union(i, j)
+
+    clusters = defaultdict(list)
+    for i in range(len(hotels)):
+        clusters[union_find.find(i)].append(i)
+
+    resolved = {}
+    for members in clusters.values():
+        if len(members) > 1:
+            rep = representative(hotels, members)
+            resolved[rep] = [i for i in members if i != rep]
+    return resolved
+
+
+def propagate(source, target):
+    """Copy the enrichment result of a cluster's representative onto a member"""
+    for field in PROPAGATED_FIELDS:
+        target[field] = source.get(field, '')
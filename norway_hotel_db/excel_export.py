@@ -0,0 +1,73 @@
+"""
+Excel input and output for the Norway hotel apps
+The same files come out of the GUIs and the headless CLI (cli.py).
+"""
+
+from datetime import datetime
+
+import pandas as pd
+from openpyxl.styles import Alignment, Font, PatternFill
+
+HEADER_FONT = Font(bold=True, color='FFFFFF')
+HEADER_FILL = PatternFill(start_color='1F4E79', end_color='1F4E79', fill_type='solid')
+
+# Column order of the enriched export (columns missing from the data are left out)
+ENRICHED_COLUMNS = [
+    'org_number', 'legal_name', 'commercial_name', 'address', 'municipality',
+    'property_type', 'stars', 'rooms', 'brand', 'operator', 'owner',
+    'board_members', 'revenue', 'google_rating', 'phone', 'email', 'website',
+    'tripadvisor_url', 'data_source', 'retry_sources', 'last_updated', 'status'
+]
+
+ENRICHED_COLUMN_WIDTHS = {
+    'A': 12, 'B': 25, 'C': 25, 'D': 30, 'E': 15,
+    'F': 12, 'G': 8, 'H': 8, 'I': 15, 'J': 20,
+    'K': 20, 'L': 25, 'M': 12, 'N': 8, 'O': 15,
+    'P': 20, 'Q': 30, 'R': 40, 'S': 20, 'T': 12, 'U': 10
+}
+
+
+def read_hotels_file(filepath):
+    """Hotel rows from an Excel or CSV file"""
+    if filepath.endswith('.csv'):
+        return pd.read_csv(filepath)
+    return pd.read_excel(filepath)
+
+
+def export_discovered(hotels, filepath):
+    """Write discovered hotels (list of dicts) to Excel; returns the number of rows"""
+    df = pd.DataFrame(hotels)
+    df['export_date'] = datetime.now().strftime('%Y-%m-%d')
+
+    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Hotels', index=False)
+
+        ws = writer.sheets['Hotels']
+        for cell in ws[1]:
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+
+        ws.freeze_panes = 'A2'
+    return len(df)
+
+
+def export_enriched(output_df, filepath):
+    """Write enrichment results to Excel in the standard column order; returns the number of rows"""
+    available_columns = [c for c in ENRICHED_COLUMNS if c in output_df.columns]
+    export_df = output_df[available_columns]
+
+    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        export_df.to_excel(writer, sheet_name='Norway Hotels', index=False)
+
+        worksheet = writer.sheets['Norway Hotels']
+        for col, width in ENRICHED_COLUMN_WIDTHS.items():
+            worksheet.column_dimensions[col].width = width
+
+        for cell in worksheet[1]:
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = Alignment(horizontal='center', wrap_text=True)
+
+        # Freeze header row
+        worksheet.freeze_panes = 'A2'
+    return len(export_df)
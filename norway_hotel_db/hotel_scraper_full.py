@@ -4,56 +4,82 @@ Discovers AND enriches all hotels/B&Bs in Norway from scratch.
 
 Sources:
 1. Brreg API (free) - Find all hotel companies by NACE code
+   (or the Brreg bulk enheter dump, streamed and filtered locally)
 2. Google Places API (free 300/day) - Commercial names, ratings, address, phone, website
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
-import requests
-import pandas as pd
+import itertools
+import queue
 from datetime import datetime
 import os
-import time
 import re
 import random
 
+from area_harvest import PartialHarvest, group_by_municipality, harvest_area, harvest_query, match_places
+from brreg import DISCOVERY_WORKERS, NACE_CODES, REGIONS, SOURCE_API, SOURCE_BULK, SOURCE_DELTA
+from discovery_run import DiscoveryRun
+from enrichment_cache import EnrichmentCache
+from entity_resolution import propagate, resolve_entities
+from excel_export import export_discovered
+from http_client import REPLAY, create_session
+from progress import ProgressModel, format_duration
+from results_table import VirtualTable
+from quota import QuotaLedger, QuotaScheduler, quota_limit
+from resilience import CircuitBreaker
+from storage import DiscoveryStore
+
 # ============================================================
 # CONFIGURATION
 # ============================================================
 # Set your API key via environment variable or paste here
 GOOGLE_PLACES_API_KEY = os.environ.get("GOOGLE_PLACES_API_KEY", "")
 
-# Fylkesnummer prefix for filtering (first 2 digits of kommunenummer)
-FYLKE_PREFIX = {
-    "Nord-Norge": ["18", "54", "55"],  # Nordland (18xx), Troms (54xx), Finnmark (55xx)
-    "Trøndelag": ["50"],  # Trøndelag (50xx)
-    "Vestlandet": ["11", "46", "15"],  # Rogaland (11xx), Vestland (46xx), Møre og Romsdal (15xx)
-    "Østlandet": ["03", "31", "32", "33", "34", "38", "39", "40"],  # Oslo, Viken, Innlandet, etc
-    "Sørlandet": ["42"],  # Agder (42xx)
-    "Hele Norge": []  # All - no filter
-}
+# Enrichment statuses that count as done (anything else is still pending)
+DONE_STATUSES = ('Enriched', 'No match')
+
+UI_FLUSH_MS = 100  # Queued row and status updates reach the window this often
+UI_BATCH_ROWS = 20000  # Rows applied per flush at most, so big loads don't freeze the window
 
-# NACE codes for accommodation (use short codes - API returns 55.100, 55.200, etc)
-NACE_CODES = {
-    "hotels": ["55.100"],  # Hotels
-    "bb": ["55.200", "55.900"],  # B&B, hostels, other accommodation
-    "camping": ["55.300"]  # Camping
-}
+# Discover + Enrich: discovered hotels flow through a bounded queue into enrichment workers
+PIPELINE_QUEUE_SIZE = 50  # Hotels waiting for a worker; discovery pauses when the queue is full
+PIPELINE_WORKERS = 4  # Concurrent Google lookups (still paced per host by the session)
 
 
 class HotelScraperApp:
     def __init__(self, root):
         self.root = root
-        self.root.title("Norway Hotel Database - Full Scraper")
+        self.root.title("Norway Hotel Database - Full Scraper" + (" (replay from archive)" if REPLAY else ""))
         self.root.geometry("1200x700")
 
         self.hotels = []
         self.is_running = False
-        self.api_calls = 0  # Track Google API calls
-        self.MAX_API_CALLS = 300  # Free limit
+        self.api_calls = 0  # Google API calls made this session
+        self.MAX_API_CALLS = quota_limit('google')  # Free limit per day
+        self.discovery_summary = ''
+        self.harvest_summary = ''
+        self.duplicates = {}  # Representative index -> member indexes (same physical hotel)
+        self.pipeline = None  # Enrichment queue while a Discover + Enrich run is discovering
+        self.pipeline_orgs = set()
+        self.progress = ProgressModel()  # Status/source counters, so stats never rescan self.hotels
+        self.store = DiscoveryStore()
+        self.cache = EnrichmentCache(reuse=not REPLAY)  # Replay re-derives results from archived responses
+        self.session = create_session()  # Google requests, paced per host
+        self.google_breaker = CircuitBreaker('google')
+        self.ledger = QuotaLedger()
+        self.quota = QuotaScheduler(self.ledger, 'google', GOOGLE_PLACES_API_KEY)
+
+        # Worker threads queue UI changes here; flush_ui applies them in batches on the Tk thread
+        self.ui_lock = threading.Lock()
+        self.row_updates = {}  # org_number -> row values (latest wins until the next flush)
+        self.status_text = None
+        self.stats_text = None
 
         self.setup_ui()
+        self.load_previous_session()
+        self.root.after(UI_FLUSH_MS, self.flush_ui)
 
     def setup_ui(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -74,7 +100,7 @@ class HotelScraperApp:
 
         ttk.Label(settings_frame, text="Region:").grid(row=0, column=0, sticky="w", padx=(0, 10))
         self.region_var = tk.StringVar(value="Nord-Norge")
-        ttk.Combobox(settings_frame, textvariable=self.region_var, values=list(FYLKE_PREFIX.keys()), width=20).grid(row=0, column=1, sticky="w")
+        ttk.Combobox(settings_frame, textvariable=self.region_var, values=list(REGIONS.keys()), width=20).grid(row=0, column=1, sticky="w")
 
         ttk.Label(settings_frame, text="Include:").grid(row=0, column=2, sticky="w", padx=(20, 10))
         self.include_hotels = tk.BooleanVar(value=True)
@@ -87,7 +113,23 @@ class HotelScraperApp:
         ttk.Label(settings_frame, text="Max hotels:").grid(row=1, column=0, sticky="w", pady=(10, 0))
         self.limit_var = tk.StringVar(value="300")
         ttk.Entry(settings_frame, textvariable=self.limit_var, width=10).grid(row=1, column=1, sticky="w", pady=(10, 0))
-        ttk.Label(settings_frame, text="(max 300 for free Google enrichment)", font=('Helvetica', 8)).grid(row=1, column=2, columnspan=4, sticky="w", pady=(10, 0))
+        ttk.Label(settings_frame, text="(above 300, enrichment is spread over several days of free Google quota)", font=('Helvetica', 8)).grid(row=1, column=2, columnspan=4, sticky="w", pady=(10, 0))
+
+        ttk.Label(settings_frame, text="Source:").grid(row=2, column=0, sticky="w", pady=(10, 0))
+        self.source_var = tk.StringVar(value=SOURCE_API)
+        ttk.Combobox(settings_frame, textvariable=self.source_var, values=[SOURCE_API, SOURCE_BULK, SOURCE_DELTA], width=26, state="readonly").grid(row=2, column=1, sticky="w", pady=(10, 0))
+        ttk.Label(settings_frame, text="Dump file:").grid(row=2, column=2, sticky="w", padx=(20, 10), pady=(10, 0))
+        self.dump_path_var = tk.StringVar(value="")
+        ttk.Entry(settings_frame, textvariable=self.dump_path_var, width=40).grid(row=2, column=3, columnspan=2, sticky="w", pady=(10, 0))
+        ttk.Button(settings_frame, text="Browse...", command=self.browse_dump).grid(row=2, column=5, sticky="w", pady=(10, 0))
+        ttk.Label(settings_frame, text="(empty = download latest dump from Brreg)", font=('Helvetica', 8)).grid(row=3, column=3, columnspan=3, sticky="w")
+
+        ttk.Label(settings_frame, text="Parallel requests:").grid(row=4, column=0, sticky="w", pady=(10, 0))
+        self.workers_var = tk.StringVar(value=str(DISCOVERY_WORKERS))
+        ttk.Spinbox(settings_frame, from_=1, to=16, textvariable=self.workers_var, width=8).grid(row=4, column=1, sticky="w", pady=(10, 0))
+        self.harvest_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(settings_frame, text="Area harvest first (one Google search per municipality, per-hotel calls only for leftovers)",
+                        variable=self.harvest_var).grid(row=4, column=2, columnspan=4, sticky="w", padx=(20, 0), pady=(10, 0))
 
         # Buttons
         btn_frame = ttk.Frame(main_frame)
@@ -96,6 +138,9 @@ class HotelScraperApp:
         self.discover_btn = ttk.Button(btn_frame, text="1. Discover Hotels", command=self.start_discovery, width=20)
         self.discover_btn.pack(side="left", padx=(0, 10))
 
+        self.pipeline_btn = ttk.Button(btn_frame, text="Discover + Enrich", command=lambda: self.start_discovery(pipelined=True), width=20)
+        self.pipeline_btn.pack(side="left", padx=(0, 10))
+
         self.enrich_btn = ttk.Button(btn_frame, text="2. Enrich Data", command=self.start_enrichment, width=20, state="disabled")
         self.enrich_btn.pack(side="left", padx=(0, 10))
 
@@ -112,60 +157,99 @@ class HotelScraperApp:
         results_frame.rowconfigure(0, weight=1)
 
         columns = ('org_number', 'legal_name', 'commercial_name', 'address', 'municipality', 'type', 'stars', 'brand', 'phone', 'website', 'status')
-        self.tree = ttk.Treeview(results_frame, columns=columns, show='headings', height=18)
-
         col_widths = {'org_number': 80, 'legal_name': 180, 'commercial_name': 150, 'address': 200,
                       'municipality': 90, 'type': 60, 'stars': 40, 'brand': 80, 'phone': 100, 'website': 120, 'status': 70}
-        for col in columns:
-            self.tree.heading(col, text=col.replace('_', ' ').title())
-            self.tree.column(col, width=col_widths.get(col, 100), minwidth=40)
-
-        scrollbar_y = ttk.Scrollbar(results_frame, orient="vertical", command=self.tree.yview)
-        scrollbar_x = ttk.Scrollbar(results_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
-        scrollbar_x.grid(row=1, column=0, sticky="ew")
+        # Only the visible rows are Treeview items (keyed by org_number), so 10,000+ hotels stay responsive
+        self.table = VirtualTable(results_frame, columns, widths=col_widths, height=18)
+        self.table.grid(row=0, column=0, sticky="nsew")
 
         # Status
         self.status_var = tk.StringVar(value="Ready. Click 'Discover Hotels' to start.")
         ttk.Label(main_frame, textvariable=self.status_var).grid(row=5, column=0, sticky="w")
 
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress.grid(row=6, column=0, sticky="ew", pady=(5, 0))
+        self.progress_bar = ttk.Progressbar(main_frame, mode='indeterminate')
+        self.progress_bar.grid(row=6, column=0, sticky="ew", pady=(5, 0))
 
-        self.stats_var = tk.StringVar(value="Hotels: 0 | Enriched: 0 | API calls: 0/300")
+        self.stats_var = tk.StringVar(value="Hotels: 0 | Enriched: 0 | API calls today: 0/300 | Cache: 0 hits / 0 misses")
         ttk.Label(main_frame, textvariable=self.stats_var, font=('Helvetica', 9)).grid(row=7, column=0, sticky="w", pady=(5, 0))
 
+    def load_previous_session(self):
+        """Show hotels from the last session, straight from the local store"""
+        self.hotels = self.store.load_hotels()
+        self.progress.reset(h.get('status', '') for h in self.hotels)
+        if not self.hotels:
+            return
+
+        for hotel in self.hotels:
+            self.queue_row(hotel)
+        self.enrich_btn.config(state="normal")
+        self.export_btn.config(state="normal")
+        self.update_stats()
+
+        run = self.store.get_run() or {}
+        if run.get('complete'):
+            self.status_var.set(f"Loaded {len(self.hotels)} hotels from the previous session.")
+        else:
+            self.status_var.set(f"Loaded {len(self.hotels)} hotels from an unfinished discovery. Click 'Discover Hotels' to resume.")
+
+        # An enrichment job the app was closed on while it waited for quota picks up by itself
+        job = self.store.get_meta('enrich_job') or {}
+        if job.get('active') and job.get('waiting_for_quota') and self.pending_hotels():
+            self.status_var.set(f"Resuming scheduled enrichment of {len(self.pending_hotels())} hotels...")
+            self.root.after(1000, lambda: self.start_enrichment(confirm=False))
+        elif job.get('active'):
+            self.store.set_meta('enrich_job', {'active': False})  # Closed mid-run: 'Enrich Data' continues it
+
+    def browse_dump(self):
+        filepath = filedialog.askopenfilename(
+            filetypes=[("Brreg dump", "*.json.gz *.gz *.json"), ("All files", "*.*")],
+            title="Select Brreg enheter dump"
+        )
+        if filepath:
+            self.dump_path_var.set(filepath)
+            self.source_var.set(SOURCE_BULK)
+
     def stop_process(self):
         self.is_running = False
+        self.store.set_meta('enrich_job', {'active': False})
         self.status_var.set("Stopping...")
 
-    def start_discovery(self):
+    def start_discovery(self, pipelined=False):
+        """Discovery alone, or pipelined: hotels are enriched while discovery is still paging"""
         if self.is_running:
             return
+        if pipelined:
+            self.store.set_meta('enrich_job', {'active': True})  # Like 'Enrich Data': resumed on launch if closed while waiting for quota
 
         self.is_running = True
-        self.hotels = []
+        self.discovery_summary = ''
+        self.harvest_summary = ''
+        self.duplicates = {}  # Representative index -> member indexes (same physical hotel)
         self.clear_tree()
 
         self.discover_btn.config(state="disabled")
+        self.pipeline_btn.config(state="disabled")
         self.enrich_btn.config(state="disabled")
         self.export_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
-        self.progress.start()
+        self.progress_bar.start()
 
-        thread = threading.Thread(target=self.discover_hotels)
+        thread = threading.Thread(target=self.discover_and_enrich if pipelined else self.discover_hotels)
         thread.daemon = True
         thread.start()
 
     def discover_hotels(self):
+        self.run_discovery()
+        self.is_running = False
+        self.root.after(0, self.discovery_complete)
+
+    def run_discovery(self):
         """Discover hotels using Brreg API (free, unlimited)"""
         region = self.region_var.get()
-        fylke_prefixes = FYLKE_PREFIX.get(region, [])
+        fylker = REGIONS.get(region, [])
 
         try:
-            limit = min(int(self.limit_var.get()), 300)  # Cap at 300 for free Google
+            limit = int(self.limit_var.get())  # Enrichment beyond 300 is scheduled over several days
         except:
             limit = 300
 
@@ -181,211 +265,350 @@ class HotelScraperApp:
         if not nace_codes:
             nace_codes = NACE_CODES["hotels"]
 
-        self.update_status(f"Discovering hotels in {region} via Brreg API...")
-
-        seen_orgs = set()
-
-        for nace in nace_codes:
-            if not self.is_running or len(self.hotels) >= limit:
-                break
+        try:
+            workers = int(self.workers_var.get())
+        except:
+            workers = DISCOVERY_WORKERS
+
+        run = DiscoveryRun(self.store, nace_codes, fylker, limit,
+                           should_continue=lambda: self.is_running, on_status=self.update_status)
+        run.run(self.source_var.get(), self.start_hotels, self.add_hotel,
+                workers=workers, dump=self.dump_path_var.get().strip() or None)
+        self.discovery_summary = run.summary
+
+    def start_hotels(self, hotels):
+        """The hotels a discovery run starts from: stored ones of a resumed run, or the delta-synced set"""
+        self.hotels = hotels
+        self.progress.reset(h.get('status', '') for h in hotels)
+        for hotel in hotels:
+            self.queue_row(hotel)
+        self.update_stats()
+
+    def discover_and_enrich(self):
+        """
+        Pipelined run: discovery hands each new hotel to a bounded queue that enrichment
+        workers drain, so lookups overlap the Brreg paging instead of following it.
+        """
+        self.harvest_summary = ''
+        self.progress.start_job(0)  # Grows as hotels are handed off
+        self.pipeline = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.pipeline_orgs = set()  # Hotels handed off this run
+        workers = [threading.Thread(target=self.pipeline_worker, daemon=True) for _ in range(PIPELINE_WORKERS)]
+        for worker in workers:
+            worker.start()
 
-            self.update_status(f"Searching NACE {nace}...")
-
-            # Brreg API call - get all, filter by region locally
-            page = 0
-            while self.is_running and len(self.hotels) < limit:
-                url = "https://data.brreg.no/enhetsregisteret/api/enheter"
-                params = {
-                    'naeringskode': nace,
-                    'size': 100,
-                    'page': page
-                }
-
-                try:
-                    response = requests.get(url, params=params, timeout=30)
-                    if response.status_code != 200:
-                        break
-
-                    data = response.json()
-                    companies = data.get('_embedded', {}).get('enheter', [])
-
-                    if not companies:
-                        break
-
-                    for company in companies:
-                        if not self.is_running or len(self.hotels) >= limit:
-                            break
-
-                        org = company.get('organisasjonsnummer', '')
-                        if org in seen_orgs:
-                            continue
-
-                        # Get address info
-                        addr = company.get('forretningsadresse', {}) or company.get('postadresse', {})
-                        kommune_nr = addr.get('kommunenummer', '')
-
-                        # Filter by region (fylke prefix)
-                        if fylke_prefixes and kommune_nr:
-                            if not any(kommune_nr.startswith(prefix) for prefix in fylke_prefixes):
-                                continue  # Skip if not in selected region
-
-                        seen_orgs.add(org)
-
-                        # Extract address
-                        address_parts = addr.get('adresse', [])
-                        address = ', '.join(address_parts) if address_parts else ''
-                        postal = f"{addr.get('postnummer', '')} {addr.get('poststed', '')}".strip()
-                        full_address = f"{address}, {postal}" if address else postal
-
-                        hotel = {
-                            'org_number': org,
-                            'legal_name': company.get('navn', ''),
-                            'commercial_name': '',
-                            'address': full_address,
-                            'municipality': addr.get('kommune', ''),
-                            'property_type': self.classify_type(company.get('navn', ''), nace),
-                            'stars': '',
-                            'brand': '',
-                            'phone': '',
-                            'website': '',
-                            'google_rating': '',
-                            'status': 'Discovered'
-                        }
-
-                        self.hotels.append(hotel)
-                        self.root.after(0, lambda h=hotel: self.add_tree_row(h))
-                        self.update_stats()
-
-                    page += 1
-                    time.sleep(0.3)  # Be nice to API
-
-                except Exception as e:
-                    print(f"Brreg error: {e}")
+        try:
+            self.run_discovery()
+            self.pipeline.join()
+
+            # Clusters need the full set; what is still pending now (hotels from a resumed or
+            # delta run, or deferred for quota) goes through the same workers, minus duplicates
+            merged = self.resolve_duplicates()
+            if merged:
+                self.harvest_summary = f" {merged} duplicate entities got their hotel's result without a lookup."
+            for idx, hotel in self.pending_hotels():
+                if not self.is_running:
                     break
+                if hotel['org_number'] not in self.pipeline_orgs:  # Failed lookups wait for the next run
+                    self.hand_off(idx, hotel, wait_for_quota=True)
+            self.pipeline.join()
+        finally:
+            for _ in workers:
+                self.pipeline.put(None)
+            for worker in workers:
+                worker.join()
+            self.pipeline = None
+
+        self.harvest_summary = f" Discovery{self.discovery_summary} overlapped with enrichment.{self.harvest_summary}"
+        if self.is_running:
+            self.store.set_meta('enrich_job', {'active': False})  # Done; 'Retry later' hotels wait for the next run
 
         self.is_running = False
-        self.root.after(0, self.discovery_complete)
+        self.root.after(0, self.enrichment_complete)
 
-    def classify_type(self, name, nace):
-        name_lower = name.lower()
-        if 'camping' in name_lower or nace == '55.300':
-            return 'Camping'
-        elif any(x in name_lower for x in ['pensjonat', 'gjestehus', 'b&b']):
-            return 'B&B'
-        elif 'vandrerhjem' in name_lower or 'hostel' in name_lower:
-            return 'Hostel'
-        elif 'resort' in name_lower:
-            return 'Resort'
-        elif 'lodge' in name_lower:
-            return 'Lodge'
-        return 'Hotel'
+    def hand_off(self, idx, hotel, wait_for_quota=False):
+        """
+        Queue a hotel for the pipeline's workers, blocking while the queue is full. While
+        discovering, a hotel is left for later once today's Google quota is gone, so the
+        quota wait can't stall discovery. False if the hotel wasn't queued.
+        """
+        if not wait_for_quota and not REPLAY and not self.ledger.remaining('google', GOOGLE_PLACES_API_KEY):
+            return False
+        self.progress.grow_job()
+        while self.is_running:
+            try:
+                self.pipeline.put((idx, hotel), timeout=0.5)
+                self.pipeline_orgs.add(hotel['org_number'])
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def pipeline_worker(self):
+        while True:
+            item = self.pipeline.get()
+            try:
+                if item is None:
+                    return
+                if self.is_running:  # After a stop the queue is only drained
+                    self.enrich_hotel(*item)
+            finally:
+                self.pipeline.task_done()
+
+    def add_hotel(self, hotel):
+        """A newly discovered hotel; in a pipelined run it also goes to the enrichment workers"""
+        self.hotels.append(hotel)
+        self.progress.add(hotel.get('status', ''))
+        self.queue_row(hotel)
+        self.update_stats()
+        if self.pipeline is not None:
+            self.hand_off(len(self.hotels) - 1, hotel)
 
     def discovery_complete(self):
-        self.progress.stop()
+        self.apply_ui_updates()  # The worker's last status must not overwrite the summary
+        self.progress_bar.stop()
         self.discover_btn.config(state="normal")
+        self.pipeline_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
 
         if self.hotels:
             self.enrich_btn.config(state="normal")
             self.export_btn.config(state="normal")
 
-        self.status_var.set(f"Found {len(self.hotels)} hotels. Click 'Enrich Data' to get details from Google.")
+        self.status_var.set(f"Found {len(self.hotels)} hotels{self.discovery_summary}. Click 'Enrich Data' to get details from Google.")
+
+    def pending_hotels(self):
+        """(index, hotel) pairs that still need enrichment (duplicates get their representative's result)"""
+        return [(idx, h) for idx, h in enumerate(self.hotels)
+                if h.get('status') not in DONE_STATUSES and not h.get('duplicate_of')]
 
-    def start_enrichment(self):
+    def resolve_duplicates(self):
+        """
+        Cluster entities that are the same physical hotel, so only one per cluster
+        is enriched. Representatives that are already done pass their result on now.
+        """
+        self.duplicates = resolve_entities(self.hotels)
+        duplicate_of = {m: self.hotels[rep]['org_number'] for rep, members in self.duplicates.items() for m in members}
+
+        changed = []
+        for idx, hotel in enumerate(self.hotels):
+            if hotel.get('duplicate_of', '') != duplicate_of.get(idx, ''):
+                hotel['duplicate_of'] = duplicate_of.get(idx, '')
+                changed.append(hotel)
+        self.store.save_hotels(changed)
+
+        for rep in self.duplicates:
+            if self.hotels[rep].get('status') in DONE_STATUSES:
+                self.propagate_to_duplicates(rep)
+
+        if duplicate_of:
+            print(f"Entity resolution: {len(duplicate_of)} duplicate entities in {len(self.duplicates)} clusters")
+        return len(duplicate_of)
+
+    def propagate_to_duplicates(self, idx):
+        """Copy a representative's enrichment onto the other entities of its cluster"""
+        members = [self.hotels[m] for m in self.duplicates.get(idx, [])]
+        for member in members:
+            old_status = member.get('status', '')
+            propagate(self.hotels[idx], member)
+            self.progress.change(old_status, member.get('status', ''))
+        self.store.save_hotels(members)
+        for member in members:
+            self.queue_row(member)
+
+    def start_enrichment(self, confirm=True):
         if self.is_running or not self.hotels:
             return
 
-        if self.api_calls >= self.MAX_API_CALLS:
-            messagebox.showwarning("API Limit", f"Already used {self.api_calls}/300 free API calls today.")
+        pending = self.pending_hotels()
+        if not pending:
+            messagebox.showinfo("Enrichment", "All hotels are already enriched.")
             return
 
+        windows, finish_after = self.quota.plan(len(pending))
+        if confirm and windows > 1 and not REPLAY:
+            remaining = self.ledger.remaining('google', GOOGLE_PLACES_API_KEY)
+            if not messagebox.askyesno(
+                "API Limit",
+                f"{len(pending)} hotels need enrichment but only {remaining}/{self.MAX_API_CALLS} free API calls are left today.\n\n"
+                f"Spread the job over {windows} days of free quota? It continues automatically after each reset "
+                f"(estimated done after {finish_after.astimezone():%Y-%m-%d %H:%M}), also if the app is restarted."
+            ):
+                return
+
+        self.store.set_meta('enrich_job', {'active': True})
+
         self.is_running = True
         self.discover_btn.config(state="disabled")
+        self.pipeline_btn.config(state="disabled")
         self.enrich_btn.config(state="disabled")
         self.export_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
-        self.progress.start()
+        self.progress_bar.start()
 
         thread = threading.Thread(target=self.enrich_hotels)
         thread.daemon = True
         thread.start()
 
     def enrich_hotels(self):
-        """Enrich with Google Places API (max 300 free/day)"""
-        total = len(self.hotels)
-        enriched = 0
-
-        for idx, hotel in enumerate(self.hotels):
+        """Enrich pending hotels with Google Places API, within the free daily quota"""
+        self.harvest_summary = ''
+        merged = self.resolve_duplicates()
+        if merged:
+            self.harvest_summary = f" {merged} duplicate entities got their hotel's result without a lookup."
+        self.progress.start_job(len(self.pending_hotels()))
+        if self.harvest_var.get() and GOOGLE_PLACES_API_KEY:
+            self.harvest_areas(self.pending_hotels())
+
+        for idx, hotel in self.pending_hotels():
             if not self.is_running:
                 break
+            self.enrich_hotel(idx, hotel)
 
-            if self.api_calls >= self.MAX_API_CALLS:
-                self.update_status(f"Reached free API limit (300/day). Stopping.")
-                break
+        if self.is_running:
+            self.store.set_meta('enrich_job', {'active': False})  # Done; 'Retry later' hotels wait for the next run
+
+        self.is_running = False
+        self.root.after(0, self.enrichment_complete)
 
-            legal_name = hotel.get('legal_name', '')
-            address = hotel.get('address', '')
+    def enrich_hotel(self, idx, hotel):
+        """Google Places lookup for one hotel (paced by the Google rate budget)"""
+        legal_name = hotel.get('legal_name', '')
+        address = hotel.get('address', '')
 
-            self.update_status(f"Enriching {idx + 1}/{total}: {legal_name[:40]}... (API: {self.api_calls}/300)")
+        self.update_status(f"Enriching {self.progress.job_text()}: {legal_name[:40]}... "
+                           f"(API: {self.ledger.used('google', GOOGLE_PLACES_API_KEY)}/{self.MAX_API_CALLS} today)")
 
-            # Google Places lookup
+        try:
             google_data = self.lookup_google(legal_name, address)
+        except Exception as e:
+            if not self.is_running:
+                return  # Stopped while waiting for quota - leave the hotel pending
+            print(f"Google API error: {e}")
+            self.set_status(hotel, 'Retry later')  # Not done: picked up again by the next run
+            self.progress.record_source('Google', 'failed')
+            self.progress.step()
+            self.queue_row(hotel)
+            return
 
-            if google_data:
-                hotel['commercial_name'] = google_data.get('name', '')
-                hotel['address'] = google_data.get('formatted_address', '') or hotel['address']
-                hotel['google_rating'] = google_data.get('rating', '')
-                hotel['stars'] = self.rating_to_stars(google_data.get('rating'))
-                hotel['status'] = 'Enriched'
-                enriched += 1
-            else:
-                hotel['status'] = 'No match'
-
-            # Detect brand from name
-            hotel['brand'] = self.detect_brand(hotel.get('commercial_name') or legal_name)
-
-            # Update UI
-            self.root.after(0, lambda h=hotel, i=idx: self.update_tree_row(i, h))
+        self.apply_google(hotel, google_data)
+        self.progress.record_source('Google', 'found' if google_data else 'no match')
+        self.progress.step()
+        self.store.save_hotel(hotel)
+        self.propagate_to_duplicates(idx)
+
+        # Update UI
+        self.queue_row(hotel)
+        self.update_stats()
+
+    def harvest_areas(self, pending):
+        """
+        Sweep each municipality with enough pending hotels using Text Search and
+        match the lodging places it returns locally; matched hotels are done.
+        """
+        groups = group_by_municipality(pending)
+        calls_before = self.api_calls
+        matched = 0
+
+        for count, (municipality, hotels) in enumerate(groups.items(), 1):
+            if not self.is_running:
+                break
+            self.update_status(f"Area harvest {count}/{len(groups)}: {municipality} ({len(hotels)} hotels)... "
+                               f"(API: {self.ledger.used('google', GOOGLE_PLACES_API_KEY)}/{self.MAX_API_CALLS} today)")
+            try:
+                places = self.cache.get_or_fetch(
+                    'google_area', harvest_query(municipality),
+                    lambda: harvest_area(self.harvest_request, municipality, lambda: self.is_running)
+                ) or []
+            except PartialHarvest as e:
+                print(f"Area harvest {municipality}: {e}")
+                places = e.places  # Matched now, harvested again next time
+            except Exception as e:
+                print(f"Area harvest {municipality} failed: {e}")
+                continue  # Its hotels get per-hotel lookups
+
+            for idx, place in match_places(hotels, places, municipality).items():
+                hotel = self.hotels[idx]
+                self.apply_google(hotel, place)
+                self.progress.record_source('Google area harvest', 'found')
+                self.progress.step()
+                self.store.save_hotel(hotel)
+                self.propagate_to_duplicates(idx)
+                self.queue_row(hotel)
+                matched += 1
             self.update_stats()
 
-            # Small delay between API calls
-            time.sleep(0.3)
-
-        self.is_running = False
-        self.root.after(0, self.enrichment_complete)
+        if groups:
+            self.harvest_summary += (f" Area harvest: {matched} hotels from {self.api_calls - calls_before} "
+                                    f"calls in {len(groups)} municipalities.")
+
+    def harvest_request(self, url, params):
+        """One Text Search page, retried behind the Google circuit breaker"""
+        return self.google_breaker.call(lambda: self.google_request(url, params))
+
+    def apply_google(self, hotel, google_data):
+        """Copy a Find Place / Text Search result onto the hotel and mark it done"""
+        if google_data:
+            hotel['commercial_name'] = google_data.get('name', '')
+            hotel['address'] = google_data.get('formatted_address', '') or hotel['address']
+            hotel['google_rating'] = google_data.get('rating', '')
+            hotel['stars'] = self.rating_to_stars(google_data.get('rating'))
+            self.set_status(hotel, 'Enriched')
+        else:
+            self.set_status(hotel, 'No match')
+
+        # Detect brand from name
+        hotel['brand'] = self.detect_brand(hotel.get('commercial_name') or hotel.get('legal_name', ''))
+
+    def set_status(self, hotel, status):
+        self.progress.change(hotel.get('status', ''), status)
+        hotel['status'] = status
+
+    def wait_for_quota(self, reset):
+        self.store.set_meta('enrich_job', {'active': True, 'waiting_for_quota': True})  # Resumed on the next launch
+        self.update_status(f"Free Google quota used up for today. Waiting for reset at "
+                           f"{reset.astimezone():%Y-%m-%d %H:%M} - the job continues automatically.")
 
     def lookup_google(self, name, address):
-        """Call Google Places API"""
+        """Call Google Places API (cached, retried, behind a circuit breaker). Raises if Google couldn't answer"""
         if not GOOGLE_PLACES_API_KEY:
             return None
 
-        try:
-            # Clean company suffixes
-            clean_name = re.sub(r'\b(AS|ANS|DA|ENK|DRIFT|AVD)\b', '', name, flags=re.IGNORECASE).strip()
-            query = f"{clean_name} Norway"
-
-            url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
-            params = {
-                'input': query,
-                'inputtype': 'textquery',
-                'fields': 'name,rating,formatted_address',
-                'key': GOOGLE_PLACES_API_KEY
-            }
-
-            response = requests.get(url, params=params, timeout=10)
-            self.api_calls += 1
-
-            data = response.json()
-            print(f"Google API response for '{query}': status={data.get('status')}, candidates={len(data.get('candidates', []))}")
+        # Clean company suffixes
+        clean_name = re.sub(r'\b(AS|ANS|DA|ENK|DRIFT|AVD)\b', '', name, flags=re.IGNORECASE).strip()
+        query = f"{clean_name} Norway"
+        fields = 'name,rating,formatted_address'
 
-            if data.get('status') == 'OK' and data.get('candidates'):
-                return data['candidates'][0]
-            else:
-                print(f"Google API issue: {data}")
-
-        except Exception as e:
-            print(f"Google API error: {e}")
+        return self.cache.get_or_fetch(
+            'google', f"{query}|{fields}",
+            lambda: self.google_breaker.call(lambda: self.fetch_google(query, fields))
+        )
 
+    def google_request(self, url, params):
+        """One Places API call within the daily quota; raises on errors so they aren't cached as 'no match'"""
+        if not REPLAY and not self.quota.acquire(should_continue=lambda: self.is_running, on_wait=self.wait_for_quota):
+            raise RuntimeError("stopped while waiting for quota")
+
+        response = self.session.get(url, params={**params, 'key': GOOGLE_PLACES_API_KEY}, timeout=10)
+        self.api_calls += 1
+        response.raise_for_status()  # 5xx is retried, not mistaken for 'no match'
+
+        data = response.json()
+        if data.get('status') not in ('OK', 'ZERO_RESULTS'):
+            raise RuntimeError(f"Google API issue: {data}")
+        return data
+
+    def fetch_google(self, query, fields):
+        """Find Place request for one hotel"""
+        data = self.google_request("https://maps.googleapis.com/maps/api/place/findplacefromtext/json", {
+            'input': query,
+            'inputtype': 'textquery',
+            'fields': fields,
+        })
+        print(f"Google API response for '{query}': status={data.get('status')}, candidates={len(data.get('candidates', []))}")
+
+        if data.get('candidates'):
+            return data['candidates'][0]
         return None
 
     def rating_to_stars(self, rating):
@@ -411,21 +634,26 @@ class HotelScraperApp:
         return ''
 
     def enrichment_complete(self):
-        self.progress.stop()
+        self.apply_ui_updates()
+        self.progress_bar.stop()
         self.discover_btn.config(state="normal")
+        self.pipeline_btn.config(state="normal")
         self.enrich_btn.config(state="normal")
         self.export_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
 
-        enriched = sum(1 for h in self.hotels if h.get('status') == 'Enriched')
-        self.status_var.set(f"Done! Enriched {enriched}/{len(self.hotels)} hotels. API calls: {self.api_calls}/300")
+        snap = self.progress.snapshot()
+        enriched = snap['statuses'].get('Enriched', 0)
+        used = self.ledger.used('google', GOOGLE_PLACES_API_KEY)
+        self.status_var.set(f"Done! Enriched {enriched}/{snap['rows']} hotels in {format_duration(snap['elapsed'])}. API calls: {self.api_calls} this session, {used}/{self.MAX_API_CALLS} today.{self.harvest_summary}")
 
     def clear_tree(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        with self.ui_lock:
+            self.row_updates.clear()
+        self.table.clear()
 
-    def add_tree_row(self, hotel):
-        self.tree.insert('', 'end', values=(
+    def row_values(self, hotel):
+        return (
             hotel.get('org_number', ''),
             hotel.get('legal_name', '')[:35],
             hotel.get('commercial_name', '')[:30],
@@ -437,31 +665,43 @@ class HotelScraperApp:
             hotel.get('phone', ''),
             hotel.get('website', '')[:25] if hotel.get('website') else '',
             hotel.get('status', '')
-        ))
-
-    def update_tree_row(self, idx, hotel):
-        items = self.tree.get_children()
-        if idx < len(items):
-            self.tree.item(items[idx], values=(
-                hotel.get('org_number', ''),
-                hotel.get('legal_name', '')[:35],
-                hotel.get('commercial_name', '')[:30],
-                hotel.get('address', '')[:40],
-                hotel.get('municipality', ''),
-                hotel.get('property_type', ''),
-                hotel.get('stars', ''),
-                hotel.get('brand', ''),
-                hotel.get('phone', ''),
-                hotel.get('website', '')[:25] if hotel.get('website') else '',
-                hotel.get('status', '')
-            ))
+        )
+
+    def queue_row(self, hotel):
+        """Add or refresh the hotel's row at the next flush. Any thread; never waits on Tk"""
+        values = self.row_values(hotel)
+        with self.ui_lock:
+            self.row_updates[hotel.get('org_number') or id(hotel)] = values
+
+    def apply_ui_updates(self):
+        """Apply queued rows (up to UI_BATCH_ROWS), status and stats. Tk thread only"""
+        with self.ui_lock:
+            keys = list(itertools.islice(self.row_updates, UI_BATCH_ROWS))
+            rows = [(key, self.row_updates.pop(key)) for key in keys]
+            status, self.status_text = self.status_text, None
+            stats, self.stats_text = self.stats_text, None
+
+        for key, values in rows:
+            self.table.set_row(key, values)
+        if status is not None:
+            self.status_var.set(status)
+        if stats is not None:
+            self.stats_var.set(stats)
+
+    def flush_ui(self):
+        self.apply_ui_updates()
+        self.root.after(UI_FLUSH_MS, self.flush_ui)
 
     def update_status(self, msg):
-        self.root.after(0, lambda: self.status_var.set(msg))
+        with self.ui_lock:
+            self.status_text = msg
 
     def update_stats(self):
-        enriched = sum(1 for h in self.hotels if h.get('status') == 'Enriched')
-        self.root.after(0, lambda: self.stats_var.set(f"Hotels: {len(self.hotels)} | Enriched: {enriched} | API calls: {self.api_calls}/300"))
+        snap = self.progress.snapshot()
+        enriched = snap['statuses'].get('Enriched', 0)
+        text = f"Hotels: {snap['rows']} | Enriched: {enriched} | API calls today: {self.ledger.used('google', GOOGLE_PLACES_API_KEY)}/{self.MAX_API_CALLS} | {self.cache.stats_text()}"
+        with self.ui_lock:
+            self.stats_text = text
 
     def export_to_excel(self):
         if not self.hotels:
@@ -481,22 +721,8 @@ class HotelScraperApp:
             return
 
         try:
-            df = pd.DataFrame(self.hotels)
-            df['export_date'] = datetime.now().strftime('%Y-%m-%d')
-
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Hotels', index=False)
-
-                ws = writer.sheets['Hotels']
-                from openpyxl.styles import Font, PatternFill
-
-                for cell in ws[1]:
-                    cell.font = Font(bold=True, color='FFFFFF')
-                    cell.fill = PatternFill(start_color='1F4E79', end_color='1F4E79', fill_type='solid')
-
-                ws.freeze_panes = 'A2'
-
-            messagebox.showinfo("Success", f"Exported {len(self.hotels)} hotels to:\n{filepath}")
+            exported = export_discovered(self.hotels, filepath)
+            messagebox.showinfo("Success", f"Exported {exported} hotels to:\n{filepath}")
             os.startfile(os.path.dirname(filepath))
 
         except Exception as e:
@@ -0,0 +1,148 @@
+"""
+Fast HTML parsing for the scraped sources (Proff.no, TripAdvisor)
+The lookups only need a few values near known labels ("Daglig leder", "123 rooms"),
+so instead of building a BeautifulSoup tree of the whole page they run precompiled
+patterns over its visible text. Scripts, styles and comments - most of a TripAdvisor
+page - are cut out first.
+Pages that ship their data as embedded JSON (Next.js __NEXT_DATA__, ld+json) are read
+from that instead; the text patterns are the fallback.
+Large pages are parsed on a process pool (parse_offloaded), so parsing runs on every
+core alongside the downloads instead of holding the GIL in the I/O threads.
+"""
+
+import html
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+NOISE_RE = re.compile(r'<(script|style|noscript|svg|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->', re.S | re.I)
+TAG_RE = re.compile(r'<[^>]+>')
+LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+SPACE_RE = re.compile(r'[^\S\n]+')
+# Only <script> tags marked as data; other scripts are skipped without scanning their body
+JSON_SCRIPT_RE = re.compile(
+    r'<script\b(?=[^>]*(?:\bid=["\']__NEXT_DATA__["\']|\btype=["\']application/(?:ld\+)?json["\']))'
+    r'([^>]*)>(.*?)</script\s*>', re.S | re.I)
+
+PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Pool processes; one core is left for I/O and the UI
+POOL_MIN_BYTES = 32 * 1024  # Smaller pages parse faster than the round trip to a pool process
+
+parse_pool = None
+parse_pool_lock = threading.Lock()
+
+
+def set_parse_workers(workers):
+    """Size of the parse pool; 0 parses in the calling thread (e.g. in sharded worker processes)"""
+    global PARSE_WORKERS
+    PARSE_WORKERS = max(0, int(workers))
+
+
+def get_parse_pool():
+    """The process pool, started on first use"""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is None:
+            parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return parse_pool
+
+
+def parse_offloaded(parse, content, *args):
+    """
+    parse(content, *args) on the process pool; only the calling thread waits, and only
+    the small result comes back. parse must be a module-level function. Small pages,
+    PARSE_WORKERS = 0 or a pool that can't run are parsed in the calling thread.
+    """
+    if PARSE_WORKERS < 1 or len(content) < POOL_MIN_BYTES:
+        return parse(content, *args)
+    try:
+        future = get_parse_pool().submit(parse, content, *args)
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        print(f"Parse pool unavailable, parsing in-process: {e}")
+        set_parse_workers(0)
+        return parse(content, *args)
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        print(f"Parse pool unavailable, parsing in-process: {e}")
+        set_parse_workers(0)
+        return parse(content, *args)
+
+
+def to_text(content, encoding=None):
+    """Page markup as str (response.content is bytes)"""
+    if isinstance(content, bytes):
+        return content.decode(encoding or 'utf-8', errors='replace')
+    return content
+
+
+def strip_noise(markup):
+    """Markup without script/style/svg/template blocks and comments"""
+    return NOISE_RE.sub(' ', to_text(markup))
+
+
+def page_text(markup):
+    """
+    Visible text of a page. Tag boundaries become line breaks, so a value never runs
+    into the next table cell; other whitespace is collapsed to single spaces.
+    """
+    text = html.unescape(TAG_RE.sub('\n', strip_noise(markup)))
+    return LINE_BREAK_RE.sub('\n', SPACE_RE.sub(' ', text)).strip()
+
+
+def embedded_json(markup):
+    """Decoded JSON payloads of the page's data scripts, __NEXT_DATA__ first, then ld+json"""
+    payloads = []
+    for attrs, body in JSON_SCRIPT_RE.findall(to_text(markup)):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            continue
+        if '__NEXT_DATA__' in attrs:
+            payloads.insert(0, data)
+        else:
+            payloads.append(data)
+    return payloads
+
+
+def json_objects(data):
+    """Every object in a decoded JSON document, in document order"""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+
+
+def json_scalar(value):
+    """A JSON value as text: {"name": ..} / {"ratingValue": ..} objects and lists give their first value"""
+    if isinstance(value, list):
+        return json_scalar(value[0]) if value else ''
+    if isinstance(value, dict):
+        for key in ('name', 'value', 'ratingValue', 'amount'):
+            if value.get(key) not in (None, ''):
+                return json_scalar(value[key])
+        return ''
+    if value is None or isinstance(value, bool):
+        return ''
+    return str(value).strip()
+
+
+def find_json_value(payloads, keys):
+    """First non-empty value stored under one of the keys (case-insensitive), as text"""
+    keys = {key.casefold() for key in keys}
+    for payload in payloads:
+        for obj in json_objects(payload):
+            for key, value in obj.items():
+                if key.casefold() in keys:
+                    text = json_scalar(value)
+                    if text:
+                        return text
+    return ''
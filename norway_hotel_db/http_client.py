@@ -0,0 +1,211 @@
+"""
+Shared HTTP plumbing for the Norway hotel apps
+Keep-alive sessions with a connection pool sized for the worker count, and a
+per-host token-bucket scheduler that paces every request those sessions make.
+Every response is recorded to hotel_data/response_archive.db; with HTTP_ARCHIVE=replay
+the sessions answer from that archive instead, without touching the network.
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from storage import ResponseArchive
+
+ARCHIVE_MODE = os.environ.get("HTTP_ARCHIVE", "record").strip().lower()  # record | replay | off
+REPLAY = ARCHIVE_MODE == 'replay'
+SECRET_PARAMS = {'key'}  # API keys stay out of the archive
+UNARCHIVED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie'}
+
+# host: (requests per second, burst, jitter as a fraction of one interval)
+HOST_RATES = {
+    'data.brreg.no': (8.0, 8, 0.0),
+    'maps.googleapis.com': (5.0, 5, 0.0),
+    'api.proff.no': (2.0, 2, 0.0),
+    'www.proff.no': (0.2, 1, 1.0),  # Scraped sites: one page every 5-10 s, irregular
+    'www.tripadvisor.com': (0.2, 1, 1.0),
+}
+DEFAULT_RATE = (2.0, 2, 0.0)
+
+THROTTLE_STATUSES = {403, 429, 500, 502, 503, 504}
+MIN_RATE_FACTOR = 0.1  # Backoff never goes below a tenth of the configured rate
+RECOVERY_FACTOR = 1.1  # Each good response wins back 10% of the rate
+MAX_RETRY_AFTER = 300
+
+
+class TokenBucket:
+    """
+    Rate and burst budget for one host.
+    Callers reserve a token and sleep outside the lock, so concurrent callers
+    queue up at the host's rate instead of all waking at once.
+    """
+
+    def __init__(self, rate, burst, jitter=0.0):
+        self.max_rate = self.rate = float(rate)
+        self.burst = max(1, burst)
+        self.jitter = jitter
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token; returns how long to wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            wait = max(wait, self.blocked_until - now)
+        if self.jitter:
+            wait += random.uniform(0, self.jitter / self.rate)
+        return wait
+
+    def slow_down(self, retry_after=None):
+        """Halve the rate and pause the host (Retry-After, or one interval)"""
+        with self.lock:
+            self.rate = max(self.max_rate * MIN_RATE_FACTOR, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    def speed_up(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * RECOVERY_FACTOR)
+
+
+def parse_retry_after(value):
+    """Retry-After in seconds (the HTTP-date form is ignored)"""
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateScheduler:
+    """
+    One token bucket per host, shared by every session in the process.
+    A slow or throttled host only delays requests to that host.
+    """
+
+    def __init__(self, rates=None, share=1.0):
+        self.rates = {**HOST_RATES, **(rates or {})}
+        self.share = share  # Fraction of each host's rate for this process (sharded runs split it)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlsplit(url).hostname or ''
+        with self.lock:
+            if host not in self.buckets:
+                rate, burst, jitter = self.rates.get(host, DEFAULT_RATE)
+                self.buckets[host] = TokenBucket(rate * self.share, max(1, int(burst * self.share)), jitter)
+            return self.buckets[host]
+
+    def wait(self, url):
+        delay = self.bucket(url).reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def feedback(self, url, response):
+        """Back off on throttling/blocking/server errors, recover on anything else"""
+        bucket = self.bucket(url)
+        if response.status_code in THROTTLE_STATUSES:
+            bucket.slow_down(parse_retry_after(response.headers.get('Retry-After')))
+        else:
+            bucket.speed_up()
+
+
+rate_scheduler = RateScheduler()
+
+
+class NotArchived(requests.RequestException):
+    """Replay asked for a response that was never recorded"""
+
+
+archive_lock = threading.Lock()
+response_archive = None
+
+
+def shared_archive():
+    """The process-wide response archive (opened on first use), or None with HTTP_ARCHIVE=off"""
+    global response_archive
+    if ARCHIVE_MODE == 'off':
+        return None
+    with archive_lock:
+        if response_archive is None:
+            response_archive = ResponseArchive()
+        return response_archive
+
+
+def archive_key(method, url, params=None):
+    """Method + full URL with sorted query parameters, without API keys"""
+    parts = urlsplit(requests.Request(method, url, params=params).prepare().url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    return f"{method.upper()} {urlunsplit(parts._replace(query=urlencode(query)))}"
+
+
+def archive_response(archive, key, response):
+    headers = {k: v for k, v in response.headers.items() if k.lower() not in UNARCHIVED_HEADERS}
+    archive.record(key, response.status_code, response.reason, headers, response.content)
+
+
+def replay_response(archive, key, method, url):
+    """The archived response for key as a requests.Response; raises NotArchived"""
+    entry = archive.lookup(key) if archive else None
+    if entry is None:
+        raise NotArchived(f"not in the response archive: {key}")
+    status, reason, headers, body = entry
+
+    response = requests.Response()
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = url
+    response.request = requests.Request(method, url).prepare()
+    return response
+
+
+class ScheduledSession(requests.Session):
+    """
+    requests.Session that waits for its host's token before every request and
+    archives the response. When replaying, requests are answered from the archive
+    with no pacing at all.
+    """
+
+    def __init__(self, scheduler=None, archive=None):
+        super().__init__()
+        self.scheduler = scheduler or rate_scheduler
+        self.archive = archive
+
+    def request(self, method, url, *args, **kwargs):
+        archive = self.archive or shared_archive()
+        key = archive_key(method, url, kwargs.get('params'))
+        if REPLAY:
+            return replay_response(archive, key, method, url)
+
+        self.scheduler.wait(url)
+        response = super().request(method, url, *args, **kwargs)
+        self.scheduler.feedback(url, response)
+        if archive and not kwargs.get('stream'):
+            archive_response(archive, key, response)
+        return response
+
+
+def create_session(pool_size=10, headers=None, scheduler=None, archive=None):
+    """Rate-scheduled, archiving requests.Session that reuses up to pool_size connections per host"""
+    session = ScheduledSession(scheduler, archive)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
@@ -0,0 +1,112 @@
+"""
+Running progress counters for the apps
+Counts per status and per source are updated as rows change, so status bars never
+rescan the hotel list. Throughput and ETA come from the most recent completions.
+Thread-safe: worker threads update, the UI (or a console loop) reads snapshots.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+
+THROUGHPUT_WINDOW = 50  # Completions the rows/second estimate is based on
+
+
+def format_duration(seconds):
+    """3h 05m, 4m 10s or 12s"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressModel:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statuses = Counter()  # status -> rows
+        self.sources = Counter()  # (source, outcome) -> rows
+        self.job_total = 0
+        self.job_done = 0
+        self.started = None
+        self.recent = deque(maxlen=THROUGHPUT_WINDOW)  # (time, job_done) of the last completions
+
+    def reset(self, statuses=()):
+        """Start counting from scratch, e.g. with the statuses of a loaded session"""
+        with self.lock:
+            self.statuses = Counter(statuses)
+            self.sources.clear()
+
+    def add(self, status):
+        """A new row"""
+        with self.lock:
+            self.statuses[status] += 1
+
+    def change(self, old, new):
+        """A row moved from one status to another"""
+        if old == new:
+            return
+        with self.lock:
+            self.statuses[old] -= 1
+            if self.statuses[old] <= 0:
+                del self.statuses[old]
+            self.statuses[new] += 1
+
+    def record_source(self, source, outcome):
+        with self.lock:
+            self.sources[(source, outcome)] += 1
+
+    def start_job(self, total):
+        """A run over total rows begins; throughput and ETA are measured against it"""
+        with self.lock:
+            self.job_total = total
+            self.job_done = 0
+            self.started = time.monotonic()
+            self.recent.clear()
+            self.recent.append((self.started, 0))
+
+    def grow_job(self, count=1):
+        """count more rows joined the running job (pipelined runs learn their size as they go)"""
+        with self.lock:
+            self.job_total += count
+
+    def step(self, count=1):
+        """count rows of the current job are finished"""
+        with self.lock:
+            self.job_done += count
+            self.recent.append((time.monotonic(), self.job_done))
+
+    def count(self, *statuses):
+        with self.lock:
+            return sum(self.statuses[status] for status in statuses)
+
+    def snapshot(self):
+        """Consistent copy of the counters, plus throughput (rows/s) and ETA (seconds, or None)"""
+        with self.lock:
+            rate = 0.0
+            if len(self.recent) >= 2:
+                (first_time, first_done), (last_time, last_done) = self.recent[0], self.recent[-1]
+                if last_time > first_time:
+                    rate = (last_done - first_done) / (last_time - first_time)
+            remaining = max(0, self.job_total - self.job_done)
+            return {
+                'rows': sum(self.statuses.values()),
+                'statuses': dict(self.statuses),
+                'sources': dict(self.sources),
+                'job_total': self.job_total,
+                'job_done': self.job_done,
+                'rate': rate,
+                'eta': remaining / rate if rate else None,
+                'elapsed': time.monotonic() - self.started if self.started else 0.0,
+            }
+
+    def job_text(self, unit='hotels'):
+        """'120/500 | 2.4 hotels/s | ETA 2m 38s' for the current job"""
+        snap = self.snapshot()
+        text = f"{snap['job_done']}/{snap['job_total']}"
+        if snap['rate']:
+            text += f" | {snap['rate']:.1f} {unit}/s"
+        if snap['eta'] is not None and snap['job_done'] < snap['job_total']:
+            text += f" | ETA {format_duration(snap['eta'])}"
+        return text
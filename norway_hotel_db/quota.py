@@ -0,0 +1,129 @@
+"""
+Persistent API quota ledger and quota-aware scheduling
+Usage is counted per source and API key in hotel_data/quota.db, so restarting
+the app (or running both apps) can't reset the counter and overspend the free tier.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from storage import connect, get_data_path
+
+QUOTA_DB = "quota.db"
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC = ZoneInfo("America/Los_Angeles")
+except Exception:  # No tz database (e.g. Windows without tzdata)
+    PACIFIC = timezone(timedelta(hours=-8))
+
+# source: (calls per daily window, timezone whose midnight resets the window)
+QUOTAS = {
+    'google': (300, PACIFIC),  # Google resets daily quotas at midnight Pacific Time
+}
+
+
+def quota_limit(source):
+    return QUOTAS[source][0]
+
+
+def current_window(source, now=None):
+    """(window id, reset time in UTC) for the daily window containing now"""
+    tz = QUOTAS[source][1]
+    local = (now or datetime.now(timezone.utc)).astimezone(tz)
+    next_day = local.date() + timedelta(days=1)
+    reset = datetime(next_day.year, next_day.month, next_day.day, tzinfo=tz)
+    return local.date().isoformat(), reset.astimezone(timezone.utc)
+
+
+def key_id(api_key):
+    """Ledger key for an API key - the key itself is never stored"""
+    return hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+
+
+class QuotaLedger:
+    def __init__(self, path=None):
+        self.conn = connect(path or get_data_path(QUOTA_DB))
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS usage (
+                    source TEXT NOT NULL,
+                    key_id TEXT NOT NULL,
+                    window TEXT NOT NULL,
+                    used INTEGER NOT NULL,
+                    PRIMARY KEY (source, key_id, window)
+                )
+            """)
+
+    def used(self, source, api_key):
+        window, _ = current_window(source)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT used FROM usage WHERE source = ? AND key_id = ? AND window = ?",
+                (source, key_id(api_key), window)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self, source, api_key):
+        return max(0, quota_limit(source) - self.used(source, api_key))
+
+    def try_spend(self, source, api_key, n=1):
+        """
+        Record n calls if they fit in the current window. Returns False when over budget.
+        A single upsert, so concurrent threads and processes can't overshoot.
+        """
+        limit = quota_limit(source)
+        if n > limit:
+            return False
+        window, _ = current_window(source)
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO usage (source, key_id, window, used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(source, key_id, window) DO UPDATE SET used = used + excluded.used "
+                "WHERE used + excluded.used <= ?",
+                (source, key_id(api_key), window, n, limit)
+            )
+        return cursor.rowcount == 1
+
+    def next_reset(self, source):
+        return current_window(source)[1]
+
+
+class QuotaScheduler:
+    """
+    Spreads a job over as many quota windows as it needs:
+    acquire() spends one call, or waits for the next window when the budget is gone.
+    """
+
+    def __init__(self, ledger, source, api_key):
+        self.ledger = ledger
+        self.source = source
+        self.api_key = api_key
+
+    def plan(self, calls_needed):
+        """(windows needed including today, estimated reset after which the job finishes)"""
+        remaining = self.ledger.remaining(self.source, self.api_key)
+        if calls_needed <= remaining:
+            return 1, None
+
+        limit = quota_limit(self.source)
+        extra_windows = -(-(calls_needed - remaining) // limit)  # ceil
+        finish_after = self.ledger.next_reset(self.source) + timedelta(days=extra_windows - 1)
+        return 1 + extra_windows, finish_after
+
+    def acquire(self, should_continue=lambda: True, on_wait=None):
+        """Spend one call, waiting for quota resets as needed. False if stopped while waiting"""
+        while should_continue():
+            if self.ledger.try_spend(self.source, self.api_key):
+                return True
+
+            reset = self.ledger.next_reset(self.source)
+            if on_wait:
+                on_wait(reset)
+            wait_until = reset + timedelta(minutes=1)  # Small grace period after the reset
+            while should_continue() and datetime.now(timezone.utc) < wait_until:
+                time.sleep(1)
+        return False
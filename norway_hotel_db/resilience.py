@@ -0,0 +1,126 @@
+"""
+Retries and circuit breakers for enrichment lookups
+Transient errors (timeouts, dropped connections, 5xx) are retried with exponential
+backoff. Blocks (403/429) are not retried - they trip the source's circuit breaker,
+which skips that source for a cool-down period instead of burning time on every row.
+"""
+
+import random
+import threading
+import time
+
+import requests
+
+from http_client import NotArchived
+
+MINUTE = 60
+
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+BLOCK_STATUSES = {403, 429}
+
+# source: (consecutive failures to trip, consecutive blocks to trip, cool-down seconds)
+BREAKER_SETTINGS = {
+    'google': (5, 2, 5 * MINUTE),
+    'proff': (5, 2, 15 * MINUTE),
+    'tripadvisor': (5, 2, 15 * MINUTE),
+}
+DEFAULT_BREAKER = (5, 2, 10 * MINUTE)
+
+
+class SourceUnavailable(Exception):
+    """Raised instead of calling a source whose circuit breaker is open"""
+
+
+def status_of(exc):
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def is_block(exc):
+    return isinstance(exc, requests.HTTPError) and status_of(exc) in BLOCK_STATUSES
+
+
+def is_transient(exc):
+    """Worth retrying right away: network trouble or a server error"""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    status = status_of(exc)
+    return isinstance(exc, requests.HTTPError) and status is not None and status >= 500
+
+
+def retry_call(fn, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+               should_retry=is_transient):
+    """fn(), retried with exponential backoff and full jitter while should_retry(exc)"""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not should_retry(e):
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. Open: calls are refused until the cool-down ends.
+    Half-open: one probe call decides whether to close again or re-open.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.failure_threshold, self.block_threshold, self.cooldown = BREAKER_SETTINGS.get(source, DEFAULT_BREAKER)
+        self.failures = 0
+        self.blocks = 0
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.probing = True  # Half-open: let exactly one call through
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = self.blocks = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self, exc):
+        with self.lock:
+            if is_block(exc):
+                self.blocks += 1
+            else:
+                self.failures += 1
+            if self.probing or self.blocks >= self.block_threshold or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    self.trips += 1
+                    print(f"{self.source}: circuit open for {self.cooldown // MINUTE} min ({exc})")
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def call(self, fn):
+        """fn() with retries, unless the breaker is open"""
+        if not self.allow():
+            raise SourceUnavailable(f"{self.source} paused after repeated failures")
+        try:
+            value = retry_call(fn)
+        except NotArchived:
+            raise  # A replay miss says nothing about the source's health
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return value
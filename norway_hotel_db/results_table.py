@@ -0,0 +1,248 @@
+"""
+Virtualized results table for the Tk apps
+A ttk.Treeview gets slower with every item it holds, so this table keeps the rows in
+a plain Python model and only materializes the rows that fit in the window: scrolling
+rewrites the values of a small, fixed set of items. Sorting (click a heading) and the
+text filter work on per-column sort keys and a lowercase search index kept next to
+the rows, never on Tk items. Tk thread only.
+"""
+
+import re
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_ROW_HEIGHT = 20
+HEADER_HEIGHT = 25
+WHEEL_ROWS = 3  # Rows per mouse wheel notch
+
+NUMBER_RE = re.compile(r'-?\d+(?:[.,]\d+)?')
+
+
+def sort_key(value):
+    """Numbers sort numerically and before text; text sorts case-insensitively"""
+    text = str(value).strip()
+    number = text.replace(' ', '').replace('\u00a0', '')
+    if NUMBER_RE.fullmatch(number):
+        return (0, float(number.replace(',', '.')), '')
+    return (1, 0.0, text.casefold())
+
+
+class VirtualTable(ttk.Frame):
+    """
+    Treeview-like table with a filter box. Rows are (key, values) pairs; set_row adds
+    a row or replaces the values of an existing key.
+    """
+
+    def __init__(self, parent, columns, headings=None, widths=None, height=18):
+        super().__init__(parent)
+        self.columns = tuple(columns)
+        self.headings = {col: (headings or {}).get(col, col.replace('_', ' ').title()) for col in self.columns}
+
+        self.keys = []  # Row key per position (insertion order)
+        self.rows = []  # Values per position
+        self.positions = {}  # key -> position
+        self.search_index = []  # Lowercase text of each row, for the filter
+        self.sort_index = {}  # column -> sort key per position, built the first time a column is sorted
+        self.view = []  # Positions that pass the filter, in display order
+        self.view_stale = False
+        self.filter_terms = []
+        self.sort_column = None
+        self.sort_descending = False
+        self.offset = 0  # First view row shown
+        self.visible_rows = height
+        self.items = []  # The materialized Treeview items, top to bottom
+        self.selected_key = None
+        self.refresh_pending = False
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        filter_frame = ttk.Frame(self)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        ttk.Label(filter_frame, text="Filter:").pack(side="left")
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *args: self.set_filter(self.filter_var.get()))
+        ttk.Entry(filter_frame, textvariable=self.filter_var, width=30).pack(side="left", padx=(5, 10))
+        self.count_var = tk.StringVar(value="0 rows")
+        ttk.Label(filter_frame, textvariable=self.count_var).pack(side="left")
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show='headings', height=height, selectmode='browse')
+        for col in self.columns:
+            self.tree.heading(col, text=self.headings[col], command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=(widths or {}).get(col, 100), minwidth=40)
+
+        self.scrollbar_y = ttk.Scrollbar(self, orient="vertical", command=self.on_scroll)
+        scrollbar_x = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=scrollbar_x.set)
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar_y.grid(row=1, column=1, sticky="ns")
+        scrollbar_x.grid(row=2, column=0, sticky="ew")
+
+        self.row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or DEFAULT_ROW_HEIGHT)
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_wheel)  # Windows, macOS
+        self.tree.bind('<Button-4>', self.on_wheel)  # Linux
+        self.tree.bind('<Button-5>', self.on_wheel)
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self.visible_rows))
+        self.tree.bind('<Next>', lambda e: self.scroll(self.visible_rows))
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+
+    def __len__(self):
+        return len(self.rows)
+
+    # ---- Model ----
+
+    def set_row(self, key, values):
+        """Add a row, or update the row with this key"""
+        values = tuple(values)
+        pos = self.positions.get(key)
+        if pos is None:
+            pos = len(self.rows)
+            self.positions[key] = pos
+            self.keys.append(key)
+            self.rows.append(values)
+            self.search_index.append(self.search_text(values))
+            for col, keys in self.sort_index.items():
+                keys.append(sort_key(values[self.columns.index(col)]))
+            if self.sort_column is None and not self.view_stale:
+                if self.matches(pos):
+                    self.view.append(pos)  # Unsorted view is insertion order: no rebuild needed
+            else:
+                self.view_stale = True
+        else:
+            self.rows[pos] = values
+            self.search_index[pos] = self.search_text(values)
+            for col, keys in self.sort_index.items():
+                keys[pos] = sort_key(values[self.columns.index(col)])
+            if self.sort_column is not None or self.filter_terms:
+                self.view_stale = True
+        self.schedule_refresh()
+
+    def row(self, key):
+        pos = self.positions.get(key)
+        return None if pos is None else self.rows[pos]
+
+    def clear(self):
+        self.keys, self.rows, self.search_index, self.view = [], [], [], []
+        self.positions = {}
+        self.sort_index = {self.sort_column: []} if self.sort_column is not None else {}
+        self.view_stale = False
+        self.offset = 0
+        self.selected_key = None
+        self.schedule_refresh()
+
+    def search_text(self, values):
+        return '\t'.join(str(v) for v in values).casefold()
+
+    def matches(self, pos):
+        text = self.search_index[pos]
+        return all(term in text for term in self.filter_terms)
+
+    def set_filter(self, text):
+        """Show only rows containing every word of text (any column, case-insensitive)"""
+        self.filter_terms = text.casefold().split()
+        self.view_stale = True
+        self.offset = 0
+        self.schedule_refresh()
+
+    def sort_by(self, column):
+        """Sort by column; clicking the same heading again reverses the order"""
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        if column not in self.sort_index:
+            col = self.columns.index(column)
+            self.sort_index[column] = [sort_key(values[col]) for values in self.rows]
+        for col in self.columns:
+            arrow = (' ▼' if self.sort_descending else ' ▲') if col == column else ''
+            self.tree.heading(col, text=self.headings[col] + arrow)
+        self.view_stale = True
+        self.schedule_refresh()
+
+    def rebuild_view(self):
+        if self.filter_terms:
+            view = [pos for pos in range(len(self.rows)) if self.matches(pos)]
+        else:
+            view = list(range(len(self.rows)))
+        if self.sort_column is not None:
+            view.sort(key=self.sort_index[self.sort_column].__getitem__, reverse=self.sort_descending)
+        self.view = view
+        self.view_stale = False
+
+    # ---- Window ----
+
+    def schedule_refresh(self):
+        """Redraw once when Tk is idle, however many rows changed"""
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def refresh(self):
+        """Put the rows of the visible window into the materialized items"""
+        self.refresh_pending = False
+        if self.view_stale:
+            self.rebuild_view()
+
+        total = len(self.view)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        shown = self.view[self.offset:self.offset + self.visible_rows]
+
+        while len(self.items) < len(shown):
+            self.items.append(self.tree.insert('', 'end'))
+        while len(self.items) > len(shown):
+            self.tree.delete(self.items.pop())
+
+        selected = None
+        for item, pos in zip(self.items, shown):
+            self.tree.item(item, values=self.rows[pos])
+            if self.keys[pos] == self.selected_key:
+                selected = item
+        if selected:
+            self.tree.selection_set(selected)
+        elif self.tree.selection():
+            self.tree.selection_set(())
+
+        if total:
+            self.scrollbar_y.set(self.offset / total, min(1.0, (self.offset + len(shown)) / total))
+        else:
+            self.scrollbar_y.set(0.0, 1.0)
+        if self.filter_terms:
+            self.count_var.set(f"{total} of {len(self.rows)} rows")
+        else:
+            self.count_var.set(f"{len(self.rows)} rows")
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.refresh()
+        return 'break'
+
+    def on_scroll(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')"""
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(self.view))
+            self.refresh()
+        elif args[0] == 'scroll':
+            self.scroll(int(args[1]) * (self.visible_rows if args[2] == 'pages' else 1))
+
+    def on_wheel(self, event):
+        if event.num == 4:
+            notches = -1
+        elif event.num == 5:
+            notches = 1
+        else:
+            notches = -1 if event.delta > 0 else 1
+        return self.scroll(notches * WHEEL_ROWS)
+
+    def on_resize(self, event):
+        rows = max(1, (event.height - HEADER_HEIGHT) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.items:
+            index = self.items.index(selection[0])
+            if self.offset + index < len(self.view):
+                self.selected_key = self.keys[self.view[self.offset + index]]
@@ -0,0 +1,232 @@
+"""
+Sharded runs over several processes, for large regions (Hele Norge)
+The job is split by fylke (each shard discovers and enriches its own counties) or by
+org_number hash (over the hotels already in the local store). Every shard keeps its
+partial results - discovered hotels plus its enrichment journal - in its own SQLite
+file under hotel_data/shards, so a stopped run resumes shard by shard. merge_shards()
+then builds the final table deterministically: one row per org_number (the most
+complete result wins), sorted by org_number, whatever order the shards finished in.
+The per-host request rates are divided between the shards, so the sites see the same
+pace as from one process; what scales with the cores is parsing and result building.
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import zlib
+
+from brreg import DISCOVERY_WORKERS, REGIONS, SOURCE_API, fylke_names, load_kommuner, sync_filter
+from discovery_run import DiscoveryRun
+from html_parsing import set_parse_workers
+from http_client import rate_scheduler
+from storage import DiscoveryStore, EnrichmentJournal, get_data_dir
+
+SHARD_DIR = "shards"
+SHARD_JOB = "shard"  # Journal job inside a shard file
+EVENT_POLL_SECONDS = 0.5
+
+# Fallback when Brreg's kommune register can't be reached: every fylke some region names
+REGION_FYLKER = sorted({fylke for fylker in REGIONS.values() for fylke in fylker})
+
+
+def shard_of(org_number, shards):
+    """Stable shard index for an org_number (Python's hash() differs between processes)"""
+    return zlib.crc32(str(org_number).encode('utf-8')) % shards
+
+
+def all_fylker():
+    """Every fylke in Brreg's kommune register (Svalbard's 21 included)"""
+    return sorted({kommune_nr[:2] for kommune_nr in load_kommuner() if kommune_nr}) or REGION_FYLKER
+
+
+def split_fylker(fylker, shards):
+    """Fylke codes dealt round-robin over the shards; never more shards than fylker"""
+    fylker = sorted(fylker)
+    count = max(1, min(shards, len(fylker)))
+    return [fylker[i::count] for i in range(count)]
+
+
+def shard_run_dir(by, shards, region, nace_codes):
+    """Folder of one sharded job; the same settings find the same folder, and resume"""
+    key = json.dumps([by, shards, region, sorted(nace_codes)])
+    path = os.path.join(get_data_dir(), SHARD_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest()[:12])
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def shard_path(run_dir, index, shards):
+    return os.path.join(run_dir, f"shard-{index + 1:02d}-of-{shards:02d}.db")
+
+
+def plan_shards(by, shards, region, nace_codes, limit, workers, in_flight, hotels=None):
+    """
+    One spec (plain dict, so it pickles to the worker process) per shard.
+    by='fylke' splits the region's fylker; by='hash' splits hotels (the stored ones) by org_number.
+    "Hele Norge" by fylke gets one more, unfiltered shard for what the per-fylke queries
+    can't see - entities without a kommunenummer, or with one outside the register - so
+    the merged export holds the same hotels as an unsharded run.
+    """
+    remainder = None
+    if by == 'fylke':
+        if REGIONS[region]:
+            groups = split_fylker(REGIONS[region], shards)
+        else:
+            covered = all_fylker()
+            groups = split_fylker(covered, max(1, shards - 1))
+            remainder = len(groups)
+            groups.append([])  # Unfiltered query, skipping the covered fylker
+        shards = len(groups)
+    run_dir = shard_run_dir(by, shards, region, nace_codes)
+
+    specs = []
+    for index in range(shards):
+        spec = {'index': index, 'shards': shards, 'path': shard_path(run_dir, index, shards),
+                'nace_codes': list(nace_codes), 'limit': limit, 'workers': workers, 'in_flight': in_flight,
+                'fylker': groups[index] if by == 'fylke' else None,
+                'exclude_fylker': covered if index == remainder else []}
+        if by == 'hash':
+            # Written before the workers start; their journals keep progress across runs
+            part = [hotel for hotel in hotels if shard_of(hotel['org_number'], shards) == index]
+            DiscoveryStore(spec['path']).replace_hotels(part)
+        specs.append(spec)
+    return specs
+
+
+# ---- worker process ----
+
+def run_shard(spec, events, stop):
+    """
+    Worker process: discover the shard's fylker (unless its hotels were handed in),
+    then enrich every hotel not yet complete in the shard's journal.
+    Progress goes to the parent as (shard, kind, payload) tuples on events.
+    """
+    index = spec['index']
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent decides when to stop
+    sys.stdout = sys.stderr  # Engine prints must not mix with the parent's JSON stream
+
+    # Set before the first request: host buckets are created with it
+    rate_scheduler.share = 1 / spec['shards']
+    set_parse_workers(0)  # The shards already use the cores; no parse pool per shard
+    from enrichment import AsyncEnrichmentEngine, HotelEnricher, record_result
+
+    def should_continue():
+        return not stop.is_set()
+
+    def send(kind, payload=None):
+        events.put((index, kind, payload))
+
+    try:
+        store = DiscoveryStore(spec['path'])
+        if spec['fylker'] is not None:
+            hotels = discover_shard(store, spec, should_continue, send)
+        else:
+            hotels = store.load_hotels()
+
+        journal = EnrichmentJournal(spec['path'])
+        done, rows = journal.split_rows(SHARD_JOB, list(enumerate(hotels)))
+        send('job', {'total': len(rows), 'done_before': len(done)})
+
+        def on_result(idx, result):
+            record_result(journal, SHARD_JOB, idx, result)
+            send('result', result.get('status', ''))
+
+        enricher = HotelEnricher()
+        engine = AsyncEnrichmentEngine(enricher, **({'hotels_in_flight': spec['in_flight']} if spec['in_flight'] else {}))
+        asyncio.run(engine.run(rows, on_result, should_continue=should_continue))
+        send('done', {'hotels': len(hotels), 'cache': enricher.cache.stats_text(),
+                      'paused_sources': enricher.paused_sources()})
+    except Exception as e:
+        send('error', str(e))
+
+
+def discover_shard(store, spec, should_continue, send):
+    """Brreg discovery for the shard's fylker, checkpointed per page in the shard file"""
+    run_filter = sync_filter(spec['nace_codes'], spec['fylker'])
+    previous = store.get_run()
+    if previous and previous.get('complete') and previous.get('filter') == run_filter:
+        return store.load_hotels()  # Discovered by an earlier run of this job
+
+    hotels = []
+    area = (fylke_names(spec['fylker']) if spec['fylker']
+            else "entities outside the other shards' fylker")
+
+    def on_start(stored):
+        hotels.extend(stored)
+        send('status', f"Discovering {area}" + (f" ({len(stored)} hotels already found)" if stored else ''))
+
+    run = DiscoveryRun(store, spec['nace_codes'], spec['fylker'], spec['limit'], should_continue=should_continue,
+                       exclude_fylker=spec['exclude_fylker'])
+    run.run(SOURCE_API, on_start, hotels.append, workers=spec['workers'] or DISCOVERY_WORKERS)
+    send('discovered', {'hotels': len(hotels), **(run.report[1] if run.report else {})})
+    return store.load_hotels()
+
+
+# ---- parent ----
+
+def run_shards(specs, on_event, should_continue):
+    """
+    Start one process per spec and pass their events to on_event(shard, kind, payload)
+    until all have exited. When should_continue() turns False the workers are told to stop.
+    Returns the indexes of shards that reported an error.
+    """
+    context = multiprocessing.get_context('spawn')  # Same behaviour on Windows and Linux
+    events = context.Queue()
+    stop = context.Event()
+    processes = [context.Process(target=run_shard, args=(spec, events, stop), daemon=True) for spec in specs]
+    for process in processes:
+        process.start()
+
+    failed = set()
+
+    def handle(event):
+        index, kind, payload = event
+        if kind == 'error':
+            failed.add(index)
+        on_event(index, kind, payload)
+
+    while any(process.is_alive() for process in processes):
+        if not should_continue():
+            stop.set()
+        try:
+            handle(events.get(timeout=EVENT_POLL_SECONDS))
+        except queue.Empty:
+            pass
+    for process in processes:
+        process.join()
+    while True:
+        try:
+            handle(events.get_nowait())
+        except queue.Empty:
+            break
+    return failed
+
+
+def result_rank(result, complete):
+    """Higher is better: a complete result, then the one with the most filled columns"""
+    return (complete, sum(1 for value in result.values() if str(value).strip() not in ('', 'nan', 'None')))
+
+
+def merge_shards(specs):
+    """
+    Final rows of a sharded run: each shard's enriched results (its discovered hotel where
+    there is none yet), one row per org_number (rows without one are kept per shard and
+    position), sorted by org_number. Ties between shards
+    go to the lower shard index, so the same partial files always give the same table.
+    """
+    best = {}
+    for spec in sorted(specs, key=lambda spec: spec['index']):
+        journaled = EnrichmentJournal(spec['path']).load(SHARD_JOB)
+        for idx, hotel in enumerate(DiscoveryStore(spec['path']).load_hotels()):
+            key = EnrichmentJournal.row_key(hotel['org_number'], idx)
+            result, complete = journaled.get(key, (hotel, False))
+            if key == f"row:{idx}":
+                key = f"row:{spec['index']}:{idx}"  # No org_number: only unique within its shard
+            candidate = (result_rank(result, complete), result)
+            if key not in best or candidate[0] > best[key][0]:
+                best[key] = candidate
+    return [best[key][1] for key in sorted(best)]
@@ -0,0 +1,282 @@
+"""
+Local state for the Norway hotel apps
+Everything lives in a hotel_data folder next to the script (or the EXE).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+DISCOVERY_DB = "discovery.db"
+JOURNAL_DB = "enrichment_journal.db"
+ARCHIVE_DB = "response_archive.db"
+
+
+def get_data_dir():
+    """Folder for local state, created on first use"""
+    if getattr(sys, 'frozen', False):
+        # Running as compiled executable
+        base_path = os.path.dirname(sys.executable)
+    else:
+        # Running as script
+        base_path = os.path.dirname(os.path.abspath(__file__))
+
+    path = os.path.join(base_path, 'hotel_data')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_data_path(filename):
+    return os.path.join(get_data_dir(), filename)
+
+
+def connect(path):
+    """SQLite connection shared between the UI and worker threads"""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class DiscoveryStore:
+    """
+    Discovered hotels keyed on org_number, plus the page cursor of the current run.
+    A page only counts as done once its hotels are committed, so a crash or a
+    closed window loses at most the pages that were in flight.
+    """
+
+    def __init__(self, path=None):
+        self.conn = connect(path or get_data_path(DISCOVERY_DB))
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS hotels (
+                    org_number TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS pages (
+                    nace TEXT NOT NULL,
+                    fylke TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    total_pages INTEGER NOT NULL,
+                    PRIMARY KEY (nace, fylke, page)
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+            """)
+
+    # ---- meta ----
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    # ---- runs ----
+
+    def get_run(self):
+        """The current run: filter, source, complete, and delta sync point"""
+        return self.get_meta('run')
+
+    def begin_run(self, run_filter, source, since):
+        """
+        Resume the unfinished run with the same filter and source, or start a fresh one.
+        Returns True when resuming.
+        """
+        run = self.get_run()
+        if run and not run.get('complete') and run.get('filter') == run_filter and run.get('source') == source:
+            return True
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM hotels")
+            self.conn.execute("DELETE FROM pages")
+        self.set_meta('run', {'filter': run_filter, 'source': source, 'complete': False,
+                              'since': since, 'last_update_id': None})
+        return False
+
+    def finish_run(self):
+        run = self.get_run() or {}
+        run['complete'] = True
+        self.set_meta('run', run)
+
+    # ---- hotels ----
+
+    def load_hotels(self):
+        """All stored hotels, in discovery order"""
+        with self.lock:
+            rows = self.conn.execute("SELECT data FROM hotels ORDER BY rowid").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save_hotels(self, hotels):
+        """Insert or update hotels (e.g. after enrichment)"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO hotels (org_number, data) VALUES (?, ?) "
+                "ON CONFLICT(org_number) DO UPDATE SET data = excluded.data",
+                [(h['org_number'], json.dumps(h, ensure_ascii=False)) for h in hotels]
+            )
+
+    def save_hotel(self, hotel):
+        self.save_hotels([hotel])
+
+    def replace_hotels(self, hotels):
+        """Make the stored set exactly hotels (after a delta sync)"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM hotels")
+            self.conn.executemany(
+                "INSERT INTO hotels (org_number, data) VALUES (?, ?)",
+                [(h['org_number'], json.dumps(h, ensure_ascii=False)) for h in hotels]
+            )
+
+    # ---- page cursor ----
+
+    def completed_pages(self):
+        """{(nace, fylke): {page: total_pages}} for the current run"""
+        done = {}
+        with self.lock:
+            rows = self.conn.execute("SELECT nace, fylke, page, total_pages FROM pages").fetchall()
+        for nace, fylke, page, total_pages in rows:
+            done.setdefault((nace, fylke or None), {})[page] = total_pages
+        return done
+
+    def complete_page(self, nace, fylke, page, total_pages, hotels):
+        """Commit a page's hotels and mark the page done, in one transaction"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO hotels (org_number, data) VALUES (?, ?)",
+                [(h['org_number'], json.dumps(h, ensure_ascii=False)) for h in hotels]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (nace, fylke, page, total_pages) VALUES (?, ?, ?, ?)",
+                (nace, fylke or '', page, total_pages)
+            )
+
+
+def file_job_id(filepath):
+    """Journal job for an input file: its content hash, so a renamed copy still resumes"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class EnrichmentJournal:
+    """
+    Write-ahead journal of enriched rows, one job per input file.
+    Every finished row is committed as soon as it arrives, so Stop, closing the
+    window or a crash loses at most the hotels still in flight.
+    """
+
+    def __init__(self, path=None):
+        self.conn = connect(path or get_data_path(JOURNAL_DB))
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS rows (
+                    job TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    complete INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (job, key)
+                )
+            """)
+
+    @staticmethod
+    def row_key(org_number, idx):
+        """org_number identifies a hotel; rows without one fall back to their position"""
+        org_number = str(org_number or '').strip()
+        return org_number if org_number and org_number != 'nan' else f"row:{idx}"
+
+    def record(self, job, key, idx, result, complete):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rows (job, key, idx, complete, data) VALUES (?, ?, ?, ?, ?)",
+                (job, key, idx, int(complete), json.dumps(result, ensure_ascii=False, default=str))
+            )
+
+    def load(self, job):
+        """{key: (result, complete)} for everything journaled for job"""
+        with self.lock:
+            rows = self.conn.execute("SELECT key, complete, data FROM rows WHERE job = ?", (job,)).fetchall()
+        return {key: (json.loads(data), bool(complete)) for key, complete, data in rows}
+
+    def split_rows(self, job, rows):
+        """
+        ({idx: result} for the (idx, row) pairs journaled complete for job, [(idx, row)]
+        still to enrich) - how the enricher GUI, the CLI and shards skip finished rows
+        """
+        journaled = self.load(job)
+        done, pending = {}, []
+        for idx, row in rows:
+            entry = journaled.get(self.row_key(row.get('org_number', ''), idx))
+            if entry and entry[1]:
+                done[idx] = entry[0]
+            else:
+                pending.append((idx, row))
+        return done, pending
+
+    def clear(self, job):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM rows WHERE job = ?", (job,))
+
+
+class ResponseArchive:
+    """
+    Every HTTP response the apps received: URL, status, headers and the zlib-compressed
+    body. A fixed parser can re-derive fields from here instead of scraping again.
+    A URL keeps its latest response, except that an error never replaces a good one.
+    """
+
+    def __init__(self, path=None):
+        self.conn = connect(path or get_data_path(ARCHIVE_DB))
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    reason TEXT NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def record(self, key, status, reason, headers, body):
+        body = zlib.compress(body)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO responses (key, status, reason, headers, body, fetched_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    status = excluded.status, reason = excluded.reason, headers = excluded.headers,
+                    body = excluded.body, fetched_at = excluded.fetched_at
+                WHERE excluded.status < 400 OR responses.status >= 400
+            """, (key, status, reason or '', json.dumps(headers), body, time.time()))
+
+    def lookup(self, key):
+        """(status, reason, headers, body) for key, or None if it was never fetched"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, reason, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, reason, headers, body = row
+        return status, reason, json.loads(headers), zlib.decompress(body)
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,68 @@
+"""Bulk dump streaming: the chunked JSON array parser and the NACE/kommune filter"""
+
+import io
+import json
+import os
+
+import pytest
+
+from brreg import iter_bulk_hotels, iter_json_array, open_bulk_dump
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'enheter_sample.json.gz')
+
+
+def fixture_entities():
+    with open_bulk_dump(FIXTURE) as stream:
+        return json.load(stream)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 16, 64, 1 << 16])
+def test_items_spanning_chunk_boundaries(chunk_size):
+    entities = fixture_entities()
+    text = json.dumps(entities, ensure_ascii=False, indent=2)
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == entities
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1 << 16])
+def test_compact_array_with_nested_brackets(chunk_size):
+    items = [{'a': [1, [2, ']']], 'b': 'x,]'}, [], 3, "ø"]
+    text = '  \n' + json.dumps(items, separators=(',', ':'))
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == items
+
+
+def test_empty_array():
+    assert list(iter_json_array(io.StringIO(' [ \n ] '), chunk_size=2)) == []
+
+
+def test_truncated_array_raises():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO('[{"a": 1}, {"b": '), chunk_size=4))
+
+
+def test_filters_by_nace_and_fylke():
+    hotels = iter_bulk_hotels(FIXTURE, ['55.100'], ['18', '50'])
+    # 56.101 (kafé) and other fylker are dropped; entities without kommunenummer are kept
+    assert [h['org_number'] for h in hotels] == ['910000001', '910000003', '910000007']
+
+
+def test_secondary_nace_code_matches():
+    hotels = list(iter_bulk_hotels(FIXTURE, ['55.200'], ['18']))
+    assert [h['org_number'] for h in hotels] == ['910000005']
+    assert hotels[0]['municipality'] == 'VÅGAN'
+
+
+def test_no_fylker_keeps_the_whole_country():
+    hotels = iter_bulk_hotels(FIXTURE, ['55.100', '55.300'], [])
+    assert [h['org_number'] for h in hotels] == ['910000001', '910000002', '910000003',
+                                                 '910000006', '910000007', '910000008']
+
+
+def test_stops_when_asked():
+    calls = []
+
+    def should_continue():
+        calls.append(1)
+        return len(calls) <= 3
+
+    hotels = list(iter_bulk_hotels(FIXTURE, ['55.100'], [], should_continue=should_continue))
+    assert [h['org_number'] for h in hotels] == ['910000001', '910000003']